@@ -0,0 +1,79 @@
+"""Benchmark MP4 -> audio extraction: moviepy decode/re-encode vs. FFmpeg stream copy.
+
+Usage: python benchmarks/bench_extract_audio.py [fixture.mp4 ...]
+Without arguments, local fixture videos are generated with FFmpeg."""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.extract_audio import extract_audio, get_ffmpeg_exe
+
+# Fixture durations in seconds - a short track, a long track and a long mix.
+FIXTURE_DURATIONS = (60, 300, 1200)
+
+
+def make_fixture(directory, duration):
+    """Generate a progressive MP4 (H.264 + AAC) fixture of `duration` seconds."""
+    fixture_path = os.path.join(directory, f"fixture_{duration}s.mp4")
+    command = [
+        get_ffmpeg_exe(),
+        "-y",
+        "-v",
+        "error",
+        "-f",
+        "lavfi",
+        "-i",
+        f"testsrc=size=640x360:rate=25:duration={duration}",
+        "-f",
+        "lavfi",
+        "-i",
+        f"sine=frequency=440:sample_rate=44100:duration={duration}",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "ultrafast",
+        "-c:a",
+        "aac",
+        fixture_path,
+    ]
+    subprocess.run(command, check=True)
+    return fixture_path
+
+
+def moviepy_mp3(source_path, destination_path):
+    """Previous extraction path - decode the full clip and re-encode via moviepy."""
+    from moviepy.editor import VideoFileClip
+
+    video = VideoFileClip(source_path)
+    try:
+        video.audio.write_audiofile(destination_path, logger=None)
+    finally:
+        video.close()
+
+
+def time_call(func, *args):
+    """Get wall-clock seconds taken by func(*args)."""
+    time0 = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - time0
+
+
+def main(fixture_paths):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if not fixture_paths:
+            fixture_paths = [make_fixture(tmp_dir, duration) for duration in FIXTURE_DURATIONS]
+
+        print(f"{'fixture':<28}{'moviepy mp3':>14}{'ffmpeg mp3':>14}{'remux m4a':>14}")
+        for fixture_path in fixture_paths:
+            stem = os.path.join(tmp_dir, os.path.splitext(os.path.basename(fixture_path))[0])
+            moviepy_time = time_call(moviepy_mp3, fixture_path, f"{stem}_moviepy.mp3")
+            mp3_time = time_call(extract_audio, fixture_path, f"{stem}.mp3")
+            m4a_time = time_call(extract_audio, fixture_path, f"{stem}.m4a")
+            print(f"{os.path.basename(fixture_path):<28}{moviepy_time:>13.2f}s{mp3_time:>13.2f}s{m4a_time:>13.2f}s")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,90 @@
+"""Benchmark iTunes annotation: thread pool path vs. the asyncio query engine.
+
+Usage: python benchmarks/bench_query_engine.py [rows] [latency_ms]
+Queries go to a local stub of the iTunes Search API and oEmbed answering
+every request after `latency_ms`, with rate limiting disabled. Each path
+gets a fresh in-memory search cache - titles are distinct, so the cache
+never serves a hit and every row is one search request."""
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import itunes_cache, query_itunes
+from utils._threading import map_threads
+from utils.async_query import QueryEngine
+from utils.rate_limiter import RateLimiter
+
+ROWS = 300
+LATENCY_MS = 100
+TRACK = {
+    "kind": "song",
+    "trackName": "Roxanne",
+    "collectionName": "Outlandos d'Amour",
+    "artistName": "The Police",
+    "primaryGenreName": "Rock",
+    "trackTimeMillis": 192000,
+    "artworkUrl60": "https://is1-ssl.mzstatic.com/image/thumb/60x60bb.jpg",
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answer searches and oEmbed requests after a fixed latency."""
+
+    latency = LATENCY_MS / 1000
+    protocol_version = "HTTP/1.1"  # keep-alive, as the real APIs
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if self.path.startswith("/oembed"):
+            content = json.dumps({"title": "The Police - Roxanne"}).encode()
+        else:
+            content = json.dumps({"resultCount": 1, "results": [TRACK]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/javascript; charset=utf-8")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+def thread_pool_path(query_args):
+    return tuple(map_threads(query_itunes.thread_query_itunes, query_args))
+
+
+def asyncio_path(query_args):
+    return QueryEngine().query_itunes(query_args)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    StubHandler.latency = (int(sys.argv[2]) if len(sys.argv) > 2 else LATENCY_MS) / 1000
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    query_itunes.ITUNES_SEARCH_URL = f"{url}/search"
+    query_itunes.OEMBED_URL = f"{url}/oembed"
+    query_itunes.itunes_rate_limiter = RateLimiter(rate=1e9, burst=1e9)
+
+    # distinct titles, so every row is one search request
+    query_args = tuple((row_index, (f"Artist {row_index} - Song", {"id": str(row_index)})) for row_index in range(rows))
+    print(f"{rows} rows, {StubHandler.latency * 1000:.0f} ms latency")
+    for name, func in (("thread pool", thread_pool_path), ("asyncio", asyncio_path)):
+        # fresh cache per path - the asyncio path must not hit searches of the thread pool path
+        itunes_cache._search_cache = itunes_cache.SearchCache(query_itunes.fetch_search_results, ":memory:")
+        start = time.perf_counter()
+        itunes_query = func(query_args)
+        elapsed = time.perf_counter() - start
+        assert all(itunes_meta_json for _, itunes_meta_json in itunes_query)
+        print(f"{name:>12}: {elapsed:6.2f} s ({rows / elapsed:6.1f} rows/s)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
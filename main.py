@@ -1,19 +1,30 @@
-import contextlib
+import collections
 import os
+import random
 import shutil
 import sys
 import time
 
 import qdarkstyle
-import requests
-from PyQt5.QtCore import QPersistentModelIndex, Qt, QThread, QUrl, pyqtSignal
-from PyQt5.QtGui import QDesktopServices, QImage, QPixmap
+from PyQt5 import sip
+from PyQt5.QtCore import (
+    QAbstractTableModel,
+    QModelIndex,
+    QObject,
+    QRunnable,
+    Qt,
+    QThread,
+    QThreadPool,
+    QUrl,
+    pyqtSignal,
+)
+from PyQt5.QtGui import QColor, QDesktopServices, QFont, QImage, QKeySequence, QPixmap
 from PyQt5.QtWidgets import (
     QAbstractItemView,
     QApplication,
     QFileDialog,
     QMainWindow,
-    QTableWidgetItem,
+    QShortcut,
 )
 
 import utils
@@ -23,6 +34,17 @@ from ui import UiMainWindow
 BASE_PATH = os.path.dirname(os.path.abspath(__file__))
 IMG_PATH = os.path.join(BASE_PATH, "img")
 UTILS_PATH = os.path.join(BASE_PATH, "utils")
+# Rows above and below the selected row whose artwork is fetched ahead of display.
+ARTWORK_PREFETCH_ROWS = 3
+# Threads fetching and decoding artwork previews, and decoded previews kept in memory.
+ARTWORK_WORKERS = 4
+ARTWORK_PREVIEW_CACHE = 64
+# Reloads of a playlist whose pages failed to load, each after a random
+# delay of up to PLAYLIST_LOAD_BACKOFF * 2 ** attempt seconds.
+PLAYLIST_LOAD_RETRIES = 5
+PLAYLIST_LOAD_BACKOFF = 1
+# Table edits that can be undone, a whole batch edit counting as one.
+UNDO_LIMIT = 50
 
 
 class MainPage(QMainWindow, UiMainWindow):
@@ -48,50 +70,98 @@ class MainPage(QMainWindow, UiMainWindow):
         self.save_as_mp4_box.clicked.connect(self.set_check_mp4_box)
         self.url_load_button.clicked.connect(self.url_loading_button_click)
         self.url_input.returnPressed.connect(self.url_load_button.click)
+        self.url_load = None  # UrlLoading thread of the last loaded url
         self.url_input.mousePressEvent = lambda _: self.url_input.selectAll()
         self.download_button.clicked.connect(self.download_button_click)
         self.download_path.clicked.connect(self.get_download_path)
         self.itunes_annotate.clicked.connect(self.itunes_annotate_click)
         self.revert_annotate.clicked.connect(self.default_annotate_table)
-        self.video_table.cellPressed.connect(self.load_table_content)
+        # Table rows live in self.track_model - the view only paints them
+        self.track_model = TrackTableModel(self)
+        self.video_table.setModel(self.track_model)
+        self.video_table.pressed.connect(lambda index: self.load_table_content(index.row(), index.column()))
+        # browse artwork with the arrow keys too
+        self.video_table.selectionModel().currentChanged.connect(self._current_cell_changed)
+        self.artwork_previews = ArtworkPreviews(self.album_artwork.size(), parent=self)
+        self.artwork_previews.previewLoaded.connect(self._display_artwork)
         # edit table cell with single click
         self.video_table.setEditTriggers(QAbstractItemView.CurrentChanged)
         # Input changes in video property text box to appropriate cell.
         self.change_video_info_input.clicked.connect(self.replace_single_cell)
         self.change_video_info_input_all.clicked.connect(self.replace_all_cells)
         self.video_info_input.returnPressed.connect(self.change_video_info_input.click)
-        # Exit application
-        self.cancel_button.clicked.connect(self.close)
+        # Undo the last table edit or batch edit
+        self.undo_shortcut = QShortcut(QKeySequence.Undo, self)
+        self.undo_shortcut.activated.connect(self.track_model.undo)
+        # Cancel download - exit application if not downloading
+        self.cancel_button.clicked.connect(self.cancel_button_click)
+        self.cancel_token = None  # utils.CancelToken of the running download
         # Get download directory
         self.download_dir = BASE_PATH
         self.download_folder_select.setText(self._get_parent_current_dir(self.download_dir))  # get directory tail
 
+    def closeEvent(self, event):
+        if self.cancel_token is not None:
+            # stop download threads from writing files after exit
+            self.cancel_token.cancel()
+            self.down.wait()
+        self.artwork_previews.shutdown()
+        super(MainPage, self).closeEvent(event)
+
+    def cancel_button_click(self):
+        """Cancel the running download, else exit application."""
+        if self.cancel_token is None:
+            self.close()
+            return
+        self.cancel_token.cancel()
+        self.download_button.setEnabled(False)
+        self.download_status.setText("Cancelling...")
+
     def url_loading_button_click(self):
         """Reads input data from self.url_input and creates an instance
         of the UrlLoading thread."""
         # declare videos_dict upon loading url
         self.videos_dict = {}
         playlist_url = self._get_cell_text(self.url_input)
+        self._stop_url_loading()
 
         self._reflect_url_loading_status()
         self.url_fetching_data_label.show()
         self.url_load = UrlLoading(playlist_url)
         self.url_load.loadStatus.connect(self._reflect_url_loading_status)
+        self.url_load.rowsLoaded.connect(self._url_rows_loaded)
         self.url_load.countChanged.connect(self._url_loading_finished)
+        self.url_load.loadFailed.connect(self._url_loading_failed)
         self.url_load.start()
 
+    def _stop_url_loading(self):
+        """Stop the previous UrlLoading thread from streaming rows into the
+        table - it exits before its next batch."""
+        if self.url_load is None or not self.url_load.isRunning():
+            return
+        url_load = self.url_load
+        # disconnecting also drops batches already queued for the GUI thread
+        for signal in (url_load.loadStatus, url_load.rowsLoaded, url_load.countChanged, url_load.loadFailed):
+            signal.disconnect()
+        url_load.requestInterruption()
+        url_load.setParent(self)  # keep the thread object alive until it exits
+        url_load.finished.connect(url_load.deleteLater)
+
     def _reflect_url_loading_status(self, status=None):
-        """Reflect YouTube url loading status. If no status is provided,
-        hide all error label and keep table content."""
-        self.video_table.clearContents()  # clear table content when loading
+        """Reflect YouTube url loading status. On success keep the rows
+        streamed into the table, else clear table content."""
+        if status == "success":
+            self.url_fetching_data_label.hide()
+            return
+        self.videos_dict = {}
+        self.track_model.clear()  # clear table content when loading
         self.video_info_input.setText("")  # clear video info input cell
+        self.video_info_input.setToolTip("")
         self._display_artwork(None)  # clear artwork display to default image
         self.url_poor_connection.hide()
         self.url_fetching_data_label.hide()
         self.url_reattempt_load_label.hide()
         self.url_error_label.hide()
-        if status == "success":
-            return
         # if status obj is not null, but not "success"
         if status:
             if status == "invalid url":
@@ -103,14 +173,24 @@ class MainPage(QMainWindow, UiMainWindow):
             self.revert_annotate.hide()
             self.itunes_annotate.show()  # refresh "Ask butler" button
 
+    def _url_rows_loaded(self, videos_batch):
+        """Append a batch of loaded videos to self.videos_dict and the GUI
+        table while the rest of the playlist loads."""
+        # a reattempted playlist load emits already loaded videos again
+        new_videos = [video for video_id, video in videos_batch.items() if video_id not in self.videos_dict]
+        self.videos_dict.update(videos_batch)
+        self.track_model.append_videos(new_videos)
+
+    def _url_loading_failed(self, failures):
+        """Show the number of videos that could not be loaded in
+        self.video_info_input, and list them in its tooltip."""
+        self.video_info_input.setText(f"Could not load {len(failures)} video(s).")
+        self.video_info_input.setToolTip("\n".join(f"{url}: {reason}" for url, reason in failures.items()))
+
     def _url_loading_finished(self, videos_dict, is_executed):
-        """Retrieves data from thread when complete, updates GUI table."""
-        # First entry of self.videos_dict in MainPage class
-        self.videos_dict = videos_dict
-        self.video_table.clearContents()  # clear table for new loaded content
-        if is_executed:
-            self.default_annotate_table()  # set table content
-        else:
+        """Retrieves data from thread when complete - rows are already in
+        the GUI table."""
+        if not is_executed:
             self.url_error_label.show()
 
     def itunes_annotate_click(self):
@@ -120,15 +200,14 @@ class MainPage(QMainWindow, UiMainWindow):
         if not self._assert_videos_dict(self.video_info_input, "Could not get information."):
             return
 
-        self.annotate = iTunesLoading(self.videos_dict)
+        self.annotate = iTunesLoading(dict(self.videos_dict))  # rows may still be streaming in
         self.annotate.loadFinished.connect(self._itunes_annotate_finished)
         self.annotate.start()
 
     def _itunes_annotate_finished(self, itunes_query_tuple, query_status):
         """Populate GUI table with iTunes meta information once
         iTunes annotation query complete."""
-        for row_index, ITUNES_META_JSON in itunes_query_tuple:
-            self._itunes_annotate_table(row_index, ITUNES_META_JSON)
+        self.track_model.annotate_rows(itunes_query_tuple)
 
         if not query_status:
             # no iTunes metadata available or poor connection
@@ -138,48 +217,14 @@ class MainPage(QMainWindow, UiMainWindow):
             self.itunes_annotate.hide()
             self.revert_annotate.show()
 
-    def _itunes_annotate_table(self, row_index, ITUNES_META_JSON):
-        """Provide iTunes annotation guess based on video title"""
-        try:
-            song_name, song_index = ITUNES_META_JSON["track_name"], 0
-            album_name, album_index = ITUNES_META_JSON["album_name"], 1
-            artist_name, artist_index = ITUNES_META_JSON["artist_name"], 2
-            genre_name, genre_index = ITUNES_META_JSON["primary_genre_name"], 3
-            artwork_name, artwork_index = ITUNES_META_JSON["artwork_url_fullres"], 4
-        except TypeError:  # ITUNES_META_JSON was never called.
-            # get video title
-            song_name, song_index = (
-                self._get_cell_text(self.video_table.item(row_index, 0)),
-                0,
-            )
-            if not song_name:
-                song_name = "Unknown"
-
-            album_name, album_index = "Unknown", 1
-            artist_name, artist_index = "Unknown", 2
-            genre_name, genre_index = "Unknown", 3
-            artwork_name, artwork_index = "Unknown", 4
-
-        self.video_table.setItem(row_index, song_index, QTableWidgetItem(song_name))
-        self.video_table.setItem(row_index, album_index, QTableWidgetItem(album_name))
-        self.video_table.setItem(row_index, artist_index, QTableWidgetItem(artist_name))
-        self.video_table.setItem(row_index, genre_index, QTableWidgetItem(genre_name))
-        self.video_table.setItem(row_index, artwork_index, QTableWidgetItem(artwork_name))
-
     def default_annotate_table(self):
         """Default table annotation to video title in song columns"""
         if not self.videos_dict:  # i.e. an invalid playlist input
-            self.video_table.clearContents()
+            self.track_model.clear()
             return
 
         self.video_info_input.setText("")
-
-        for index, key in enumerate(self.videos_dict):
-            self.video_table.setItem(index, 0, QTableWidgetItem(key))  # part of QWidget
-            self.video_table.setItem(index, 1, QTableWidgetItem("Unknown"))
-            self.video_table.setItem(index, 2, QTableWidgetItem("Unknown"))
-            self.video_table.setItem(index, 3, QTableWidgetItem("Unknown"))
-            self.video_table.setItem(index, 4, QTableWidgetItem("Unknown"))
+        self.track_model.reset_rows()
         self.revert_annotate.hide()
         self.itunes_annotate.show()
 
@@ -189,46 +234,101 @@ class MainPage(QMainWindow, UiMainWindow):
         self.download_folder_select.setText(self._get_parent_current_dir(self.download_dir))
 
     def download_button_click(self):
-        """Executes when the button is clicked"""
+        """Executes when the button is clicked - pauses or resumes the
+        running download, if any."""
+        if self.cancel_token is not None:
+            self._toggle_download_pause()
+            return
         # assert self.videos_dict exists
         if not self._assert_videos_dict(self.download_status, "No video to download."):
             return
-        playlist_properties = self._get_playlist_properties()
-        self.download_button.setEnabled(False)
+        self.playlist_properties = self._get_playlist_properties()
+        video_items = [
+            (self.videos_dict[video_id]["title"], self.videos_dict[video_id])
+            for video_id in self.track_model.track_store.ids
+        ]
+        self.download_failures = {}
+        self.cancel_token = utils.CancelToken()
+        self.download_button.setText("Pause")
         self.download_status.setText("Downloading...")
+        self.download_status.setToolTip("")
         self.down = DownloadingVideos(
-            self.videos_dict,
+            video_items,
             self.download_dir,
-            playlist_properties,
+            self.playlist_properties,
             self.save_as_mp4_box.isChecked(),
+            self.cancel_token,
         )
+        self.down.downloadProgress.connect(self._download_progress)
         self.down.downloadCount.connect(self._download_finished)
         self.down.start()
 
     def _get_playlist_properties(self):
-        """Get video information from self.video_table to reflect to
+        """Get video information from self.track_model to reflect to
         downloaded MP3 metadata."""
+        track_store = self.track_model.track_store
         playlist_properties = []
-        for row_index, _ in enumerate(self.videos_dict.items()):
-            song_properties = {}
-            song_properties["song"] = self._get_cell_text(self.video_table.item(row_index, 0)).replace(
-                "/", "-"
-            )  # will be filename -- change illegal char to legal - make func
-            song_properties["album"] = self._get_cell_text(self.video_table.item(row_index, 1))
-            song_properties["artist"] = self._get_cell_text(self.video_table.item(row_index, 2))
-            song_properties["genre"] = self._get_cell_text(self.video_table.item(row_index, 3))
-            song_properties["artwork"] = self._get_cell_text(self.video_table.item(row_index, 4))
-
-            playlist_properties.append(song_properties)  # this assumes that dict will be ordered like list
+        for row_index in range(len(track_store)):
+            song_properties = track_store.song_properties(row_index)
+            # will be filename -- change illegal char to legal
+            song_properties["song"] = song_properties["song"].replace("/", "-")
+            playlist_properties.append(song_properties)
 
         return playlist_properties
 
+    def _download_progress(self, summary):
+        """Reflect aggregated download progress, throughput and ETA in
+        self.download_status. Failure reasons are listed in its tooltip."""
+        for row_index, track in summary["tracks"].items():
+            if track["error"]:
+                self.download_failures[row_index] = track["error"]
+
+        status = f'Downloaded {summary["completed"]}/{summary["total"]}'
+        if summary["throughput"]:
+            status += f' - {summary["throughput"] / 1e6:.1f} MB/s'
+        finished = summary["completed"] + summary["failed"] + summary["cancelled"]
+        if summary["eta"] is not None and finished < summary["total"]:
+            status += f' - {int(summary["eta"] // 60)} min. {int(summary["eta"] % 60)} sec. left'
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            status = "Cancelling..."
+        elif self.cancel_token is not None and self.cancel_token.paused:
+            status += " - paused"
+        self.download_status.setText(status + self._get_download_failures_text())
+
     def _download_finished(self, download_time):
         """Emit changes to MainPage once dowload is complete."""
         _min = int(download_time // 60)
         sec = int(download_time % 60)
-        self.download_status.setText(f"Download time: {_min} min. {sec} sec.")
+        status = f"Download time: {_min} min. {sec} sec."
+        if self.cancel_token.cancelled:
+            status = f"Download cancelled after {_min} min. {sec} sec."
+        self.download_status.setText(status + self._get_download_failures_text())
+        self.download_button.setText("Download")
         self.download_button.setEnabled(True)
+        self.cancel_token = None
+
+    def _toggle_download_pause(self):
+        """Stop starting new tracks of the running download - tracks being
+        downloaded finish - or continue it."""
+        if self.cancel_token.paused:
+            self.cancel_token.resume()
+            self.download_button.setText("Pause")
+        else:
+            self.cancel_token.pause()
+            self.download_button.setText("Resume")
+
+    def _get_download_failures_text(self):
+        """Get failed download count for self.download_status and list
+        failed songs with their reason in its tooltip."""
+        if not self.download_failures:
+            return ""
+        self.download_status.setToolTip(
+            "\n".join(
+                f'{self.playlist_properties[row_index]["song"]}: {reason}'
+                for row_index, reason in sorted(self.download_failures.items())
+            )
+        )
+        return f" - {len(self.download_failures)} failed"
 
     def load_table_content(self, row, column):
         """Display selected cell content into self.video_info_input
@@ -236,70 +336,70 @@ class MainPage(QMainWindow, UiMainWindow):
         # display video info in self.video_info_input
         self._display_cell_content(row, column)
         # load and display video artwork
-        artwork_file = self._get_cell_text(self.video_table.item(row, 4))
-        self.loaded_artwork = ArtworkLoading(artwork_file)  # if populated, `artwork_file` is a url
-        self.loaded_artwork.loadFinished.connect(self._display_artwork)
-        self.loaded_artwork.start()
+        artwork_column = self.track_model.track_store.artwork
+        artwork_file = artwork_column[row]
+        # nearest rows first
+        prefetch_rows = (row + offset * sign for offset in range(1, ARTWORK_PREFETCH_ROWS + 1) for sign in (1, -1))
+        prefetch_files = [
+            artwork_column[prefetch_row] for prefetch_row in prefetch_rows if 0 <= prefetch_row < len(artwork_column)
+        ]
+        # if populated, `artwork_file` is a url
+        self.artwork_previews.request(artwork_file, prefetch_files)
+
+    def _current_cell_changed(self, current_index, _):
+        if current_index.isValid():  # i.e. not a cleared table
+            self.load_table_content(current_index.row(), current_index.column())
 
     def _display_cell_content(self, row, column):
         """Display selected cell content in self.video_info_input"""
-        self.video_info_input.setText(self._get_cell_text(self.video_table.item(row, column)))
+        self.video_info_input.setText(self.track_model.track_store.get(row, column))
 
-    def _display_artwork(self, artwork_content):
-        """Display selected artwork on Qpixmap widget."""
-        if not artwork_content:
+    def _display_artwork(self, artwork_pixmap):
+        """Display selected artwork QPixmap on Qpixmap widget - the default
+        artwork if None."""
+        if artwork_pixmap is None:
             qt_artwork_content = os.path.join(IMG_PATH, "default_artwork.png")
             self.album_artwork.setPixmap(QPixmap(qt_artwork_content))
         else:
-            qt_artwork_content = QImage()
-            qt_artwork_content.loadFromData(artwork_content)
-            self.album_artwork.setPixmap(QPixmap.fromImage(qt_artwork_content))
+            self.album_artwork.setPixmap(artwork_pixmap)
 
         self.album_artwork.setScaledContents(True)
         self.album_artwork.setAlignment(Qt.AlignCenter)
 
     def remove_selected_items(self):
-        """Removes the selected items from self.videos_table and self.videos_dict.
-        Table widget updates -- multiple row deletion capable."""
-        video_list = []
-        if self._assert_videos_dict():
-            video_list = list(self.videos_dict.items())
-
-        row_index_list = []
-        for model_index in self.video_table.selectionModel().selectedRows():
-            row = model_index.row()
-            row_index = QPersistentModelIndex(model_index)
-            row_index_list.append(row_index)
-            with contextlib.suppress(IndexError, KeyError):
-                current_key = video_list[row][0]
-                del self.videos_dict[current_key]  # remove row item from self.videos_dict
-        for index in row_index_list:
-            self.video_table.removeRow(index.row())
+        """Removes the selected items from self.track_model and self.videos_dict.
+        Multiple row deletion capable."""
+        rows = [model_index.row() for model_index in self.video_table.selectionModel().selectedRows()]
+        track_store = self.track_model.track_store
+        for row in rows:
+            del self.videos_dict[track_store.ids[row]]  # remove row item from self.videos_dict
+        self.track_model.remove_rows(rows)
 
     def replace_single_cell(self):
-        """Change selected cell value to value in self.video_info_input."""
-        row = self.video_table.currentIndex().row()
-        column = self.video_table.currentIndex().column()
+        """Change selected cell value to value in self.video_info_input -
+        in every selected row if several are selected."""
+        current_index = self.video_table.currentIndex()
+        if not current_index.isValid():
+            return
         video_info_input_value = self._get_cell_text(self.video_info_input)
-        self._replace_cell_item(row, column, video_info_input_value)
+        self.track_model.edit_rows(self._get_selected_rows(), {current_index.column(): video_info_input_value})
 
     def replace_all_cells(self):
-        """Change all rows, except songs, in table to match selected cell row."""
+        """Change all rows, except songs, in table to match selected cell row -
+        only the selected rows if several are selected."""
         # get row of cells to replace all others
         replacement_row_index = self.video_table.currentIndex().row()
+        if replacement_row_index < 0:
+            return
+        rows = self._get_selected_rows()
+        if len(rows) < 2:
+            rows = range(self.track_model.rowCount())
+        self.track_model.replace_all(rows, replacement_row_index)
 
-        for row_index in range(self.video_table.rowCount()):
-            # omit first column (i.e. song)
-            for col_index in range(1, self.video_table.columnCount()):
-                # get current cell item to be deleted and cell item to replace
-                current_value = self._get_cell_text(self.video_table.item(row_index, col_index))
-                replacement_value = self._get_cell_text(self.video_table.item(replacement_row_index, col_index))
-                if current_value and replacement_value:
-                    self._replace_cell_item(row_index, col_index, replacement_value)
-
-    def _replace_cell_item(self, row, column, value):
-        """Replace cell with value at row / column index."""
-        self.video_table.setItem(row, column, QTableWidgetItem(value))
+    def _get_selected_rows(self):
+        """Get rows with a selected cell, else the current row."""
+        rows = {model_index.row() for model_index in self.video_table.selectionModel().selectedIndexes()}
+        return sorted(rows) or [self.video_table.currentIndex().row()]
 
     def set_check_mp3_box(self):
         """if self.save_as_mp3_box is checked, uncheck
@@ -347,44 +447,188 @@ class MainPage(QMainWindow, UiMainWindow):
         return f"../{parent_dir}/{current_dir}"
 
 
+class TrackTableModel(QAbstractTableModel):
+    """Table model of the playlist over a utils.TrackStore - the single
+    source of truth of song, album, artist, genre and artwork. Rows are
+    inserted in bulk and updates emit one dataChanged range. Edits are
+    undone last first, a batch edit of many rows in one step."""
+
+    HEADERS = ("song", "album", "artist", "genre", "artwork")
+
+    def __init__(self, parent=None):
+        super(TrackTableModel, self).__init__(parent)
+        self.track_store = utils.TrackStore()
+        self.undo_records = collections.deque(maxlen=UNDO_LIMIT)
+        self.header_font = QFont("Arial", 13)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.track_store)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.track_store.get(row, column)
+        if self.track_store.low_confidence[row]:
+            if role == Qt.ForegroundRole:
+                return QColor("orange")
+            if role == Qt.ToolTipRole:
+                return f"Uncertain iTunes match (score {self.track_store.match_score[row]:.2f}) - please check."
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.EditRole:
+            return False
+        self.edit_rows([index.row()], {index.column(): value})
+        return True
+
+    def flags(self, index):
+        return super(TrackTableModel, self).flags(index) | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            if role == Qt.DisplayRole:
+                return self.HEADERS[section]
+            if role == Qt.FontRole:
+                return self.header_font
+        return super(TrackTableModel, self).headerData(section, orientation, role)
+
+    def append_videos(self, videos):
+        """Append a default annotated row per video dict of a new video id."""
+        if not videos:
+            return
+        row_count = len(self.track_store)
+        self.beginInsertRows(QModelIndex(), row_count, row_count + len(videos) - 1)
+        self.track_store.extend(videos)
+        self.endInsertRows()
+
+    def annotate_rows(self, itunes_query_tuple):
+        """Set rows to their (video_id, ITUNES_META_JSON) iTunes annotation."""
+        rows = []
+        for video_id, ITUNES_META_JSON in itunes_query_tuple:
+            row_index = self.track_store.row(video_id)
+            if row_index is not None:  # rows may have been removed meanwhile
+                self.track_store.set_itunes_meta(row_index, ITUNES_META_JSON)
+                rows.append(row_index)
+        self.undo_records.clear()  # edits before annotation are not restored over it
+        if rows:
+            self._emit_rows_changed(min(rows), max(rows))
+
+    def reset_rows(self):
+        """Default annotation of every row to its video title."""
+        self.track_store.reset()
+        self.undo_records.clear()
+        self._emit_rows_changed(0, len(self.track_store) - 1)
+
+    def edit_rows(self, rows, values):
+        """Set the {column: value} values of every row as one undoable edit."""
+        self.undo_records.append(self.track_store.set_many(rows, values))
+        self._emit_rows_changed(min(rows), max(rows))
+
+    def replace_all(self, rows, replacement_row):
+        """Change rows, except songs, to match replacement_row as one
+        undoable edit."""
+        if not rows:
+            return
+        self.undo_records.append(self.track_store.replace_all(rows, replacement_row))
+        self._emit_rows_changed(min(rows), max(rows))
+
+    def undo(self):
+        """Undo the last edit - a batch edit in one step."""
+        if not self.undo_records:
+            return
+        rows = self.track_store.restore(self.undo_records.pop())
+        if rows:
+            self._emit_rows_changed(min(rows), max(rows))
+
+    def remove_rows(self, rows):
+        """Remove rows by index in one pass over the track store - views
+        are reset unless the rows are one contiguous run."""
+        rows = sorted(set(rows))
+        if not rows:
+            return
+        if rows[-1] - rows[0] + 1 == len(rows):
+            self.beginRemoveRows(QModelIndex(), rows[0], rows[-1])
+            self.track_store.remove(rows)
+            self.endRemoveRows()
+        else:
+            self.beginResetModel()
+            self.track_store.remove(rows)
+            self.endResetModel()
+
+    def clear(self):
+        self.beginResetModel()
+        self.track_store.clear()
+        self.undo_records.clear()
+        self.endResetModel()
+
+    def _emit_rows_changed(self, first_row, last_row):
+        if last_row >= first_row:
+            self.dataChanged.emit(self.index(first_row, 0), self.index(last_row, len(self.HEADERS) - 1))
+
+
 class UrlLoading(QThread):
-    """Load video data from YouTube url."""
+    """Load video data from YouTube url, streaming batches of loaded videos."""
 
+    rowsLoaded = pyqtSignal(dict)
     countChanged = pyqtSignal(dict, bool)
+    loadFailed = pyqtSignal(dict)  # url: error message of videos that could not be loaded
     loadStatus = pyqtSignal(str)
 
     def __init__(self, playlist_link, parent=None):
         QThread.__init__(self, parent)
         self.playlist_link = playlist_link
-        self.reattempt_count = 0
         self.override_error = False
 
     def run(self):
-        """Main function, gets all the playlist videos data, emits the info dict"""
-        # allow 5 reattempts if error in fetching YouTube videos
-        # else just get loaded videos by overriding error handling
-        if self.reattempt_count > 5:
-            self.override_error = True
-
-        try:
-            videos_dict = utils.get_youtube_content(self.playlist_link, self.override_error)
-            if not videos_dict:
-                # if empty videos_dict returns, throw invalid url warning.
-                self.loadStatus.emit("invalid url")
-            else:
-                self.loadStatus.emit("success")
-                self.countChanged.emit(videos_dict, True)
-
-        except RuntimeError as error:  # handle error from video load fail
-            error_message = str(error)
-            if any(message in error_message for message in ["not a valid URL", "Unsupported URL", "list"]):
-                self.loadStatus.emit("invalid url")
-            elif "nodename nor servname provided" in error_message:
-                self.loadStatus.emit("server error")
-            else:
+        """Main function, gets all the playlist videos data, emits the info dict.
+        Videos are retried one by one - those still failing are emitted
+        through loadFailed. Only a failed playlist page load is reattempted.
+        Exits between batches once interruption is requested."""
+        videos_dict = {}
+        failures = {}
+        for attempt in range(PLAYLIST_LOAD_RETRIES + 1):
+            try:
+                for videos_batch in utils.iter_youtube_content(
+                    self.playlist_link, self.override_error, failures=failures
+                ):
+                    if self.isInterruptionRequested():
+                        return  # another url is loading
+                    videos_dict.update(videos_batch)
+                    self.rowsLoaded.emit(videos_batch)
+                break
+            except RuntimeError as error:  # handle error from playlist load fail
+                status = self.get_error_status(str(error))
+                if status or attempt == PLAYLIST_LOAD_RETRIES:
+                    self.loadStatus.emit(status or "server error")
+                    return
                 self.loadStatus.emit("reattempt")
-                self.reattempt_count += 1
-                self.run()
+                time.sleep(random.uniform(0, PLAYLIST_LOAD_BACKOFF * 2**attempt))
+                if self.isInterruptionRequested():
+                    return
+
+        if not videos_dict:
+            # if empty videos_dict returns, throw invalid url warning.
+            error_message = next(iter(failures.values()), "")
+            self.loadStatus.emit(self.get_error_status(error_message) or "invalid url")
+            return
+        self.loadStatus.emit("success")
+        self.countChanged.emit(videos_dict, True)
+        if failures:
+            self.loadFailed.emit(failures)
+
+    @staticmethod
+    def get_error_status(error_message):
+        """Get load status of a load error - None if reattempting may help."""
+        if any(message in error_message for message in ["not a valid URL", "Unsupported URL", "list"]):
+            return "invalid url"
+        if "nodename nor servname provided" in error_message:
+            return "server error"
+        return None
 
 
 class iTunesLoading(QThread):
@@ -398,12 +642,9 @@ class iTunesLoading(QThread):
 
     def run(self):
         """Multithread query to iTunes - return tuple."""
-        try:
-            query_iter = ((row_index, key_value) for row_index, key_value in enumerate(self.videos_dict.items()))
-        except AttributeError:  # i.e. no content in table -- exit early
-            return
-        itunes_query = utils.map_threads(utils.thread_query_itunes, query_iter)
-        itunes_query_tuple = tuple(itunes_query)
+        # rows are identified by video id - they may move while querying
+        query_iter = ((video_id, (video["title"], video)) for video_id, video in self.videos_dict.items())
+        itunes_query_tuple = utils.query_itunes_rows(query_iter)
         query_status = bool(self.check_itunes_nonetype(itunes_query_tuple))
         self.loadFinished.emit(itunes_query_tuple, query_status)
 
@@ -419,43 +660,109 @@ class iTunesLoading(QThread):
             return True
 
 
-class ArtworkLoading(QThread):
-    """Load artwork bytecode for display on GUI."""
+class ArtworkPreviews(QObject):
+    """Artwork previews of the table loaded on a bounded QThreadPool. Decoded
+    previews scaled to `size` are kept in an LRU keyed by artwork url. A new
+    request drops the queued loads of earlier ones - loads already running
+    are cached but not displayed - and loads the artwork of neighbouring
+    rows behind the requested one."""
+
+    previewLoaded = pyqtSignal(object)  # QPixmap of the requested artwork, or None
+    imageLoaded = pyqtSignal(str, object)  # artwork url, decoded QImage or None - from pool threads
+
+    def __init__(self, size, workers=ARTWORK_WORKERS, cache_size=ARTWORK_PREVIEW_CACHE, parent=None):
+        super(ArtworkPreviews, self).__init__(parent)
+        self.size = size
+        self.cache_size = cache_size
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(workers)
+        self.requested_url = None
+        self._previews = collections.OrderedDict()
+        self._pending = {}  # artwork url: ArtworkPreviewLoad queued or running
+        self.imageLoaded.connect(self._image_loaded)
+
+    def request(self, artwork_url, prefetch_urls=()):
+        """Display the artwork of artwork_url, then load prefetch_urls in order."""
+        self.requested_url = artwork_url
+        for url, load in list(self._pending.items()):
+            if self.pool.tryTake(load):  # i.e. not started yet
+                del self._pending[url]
+
+        if not self.is_artwork_url(artwork_url):
+            self.previewLoaded.emit(None)  # e.g. "Unknown"
+        elif artwork_url in self._previews:
+            self._previews.move_to_end(artwork_url)
+            self.previewLoaded.emit(self._previews[artwork_url])
+        else:
+            self._load(artwork_url, priority=1)
+        for url in prefetch_urls:
+            if self.is_artwork_url(url) and url not in self._previews:
+                self._load(url)
+
+    def shutdown(self):
+        """Drop queued loads and wait for running ones - they emit to self."""
+        self.pool.clear()
+        self.pool.waitForDone()
+
+    def _load(self, artwork_url, priority=0):
+        if artwork_url in self._pending:
+            return
+        load = self._pending[artwork_url] = ArtworkPreviewLoad(artwork_url, self)
+        self.pool.start(load, priority)
+
+    def _image_loaded(self, artwork_url, artwork_image):
+        """Cache the preview of a finished load and display it if requested."""
+        self._pending.pop(artwork_url, None)
+        artwork_pixmap = None
+        if artwork_image is not None:  # failed loads are not cached
+            artwork_pixmap = QPixmap.fromImage(artwork_image)
+            self._previews[artwork_url] = artwork_pixmap
+            self._previews.move_to_end(artwork_url)
+            while len(self._previews) > self.cache_size:
+                self._previews.popitem(last=False)
+        if artwork_url == self.requested_url:
+            self.previewLoaded.emit(artwork_pixmap)
+
+    @staticmethod
+    def is_artwork_url(artwork_url):
+        return isinstance(artwork_url, str) and artwork_url.startswith(("http://", "https://"))
 
-    loadFinished = pyqtSignal(bytes)
 
-    def __init__(self, artwork_url, parent=None):
-        QThread.__init__(self, parent)
+class ArtworkPreviewLoad(QRunnable):
+    """Fetch artwork bytecode through the artwork cache and decode it to a
+    QImage scaled to the preview size - off the GUI thread. Not deleted by
+    the pool once run - ArtworkPreviews holds it until its result arrives."""
+
+    def __init__(self, artwork_url, previews):
+        super(ArtworkPreviewLoad, self).__init__()
+        self.setAutoDelete(False)
         self.artwork_url = artwork_url
+        self.previews = previews
 
     def run(self):
-        artwork_img = bytes()
-        # get url response - if not url, return empty bytes
-        try:
-            response = requests.get(self.artwork_url)
-        except (requests.exceptions.MissingSchema, requests.exceptions.ConnectionError):
-            self.loadFinished.emit(artwork_img)
-            return
-
-        # check validity of url response - if ok return img byte content
-        if response.status_code != 200:  # invalid image url
-            self.loadFinished.emit(artwork_img)
-            return
-        artwork_img = response.content
-        self.loadFinished.emit(artwork_img)
+        artwork_image = QImage()
+        # empty bytes if invalid image url
+        if artwork_image.loadFromData(utils.get_artwork(self.artwork_url)):
+            artwork_image = artwork_image.scaled(self.previews.size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+        else:
+            artwork_image = None
+        if not sip.isdeleted(self.previews):  # e.g. deleted on exit while loading
+            self.previews.imageLoaded.emit(self.artwork_url, artwork_image)
 
 
 class DownloadingVideos(QThread):
-    """Download all videos from the videos_dict using the id."""
+    """Download the (title, video) items of the table rows using the id."""
 
     downloadCount = pyqtSignal(float)  # attempt to emit delta_t
+    downloadProgress = pyqtSignal(object)  # throttled progress summary of utils.download_tracks
 
-    def __init__(self, videos_dict, download_path, playlist_properties, save_as_mp4, parent=None):
+    def __init__(self, video_items, download_path, playlist_properties, save_as_mp4, cancel_token=None, parent=None):
         QThread.__init__(self, parent)
-        self.videos_dict = videos_dict
+        self.video_items = video_items  # (title, video) of every table row
         self.download_path = download_path
         self.playlist_properties = playlist_properties
         self.save_as_mp4 = save_as_mp4
+        self.cancel_token = cancel_token
 
     def run(self):
         """Main function, downloads videos by their id while emitting progress data"""
@@ -480,10 +787,15 @@ class DownloadingVideos(QThread):
                 self.playlist_properties[index],
                 self.save_as_mp4,
             )
-            for index, key_value in enumerate(self.videos_dict.items())  # dict is naturally sorted in iteration
+            for index, key_value in enumerate(self.video_items)
+        )
+        results = utils.download_tracks(
+            video_properties, progress=self.downloadProgress.emit, cancel_token=self.cancel_token
         )
-        utils.map_threads(utils.thread_query_youtube, video_properties)
-        shutil.rmtree(mp4_path)  # remove mp4 dir
+        if self.cancel_token is not None and self.cancel_token.cancelled:
+            shutil.rmtree(mp4_path, ignore_errors=True)  # nothing is resumed after cancelling
+        elif not any(isinstance(result, Exception) for result in results):
+            shutil.rmtree(mp4_path)  # remove mp4 dir - else keep partial downloads to resume
         time1 = time.time()
 
         delta_t = time1 - time0
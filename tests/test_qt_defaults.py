@@ -1,8 +1,13 @@
-"""Test default (static) state of the application upon boot."""
+"""Test default (static) state of the application upon boot, url reloads
+and the artwork preview loader."""
 import os
 import sys
+import threading
 import unittest
+from unittest import mock
 
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt
+from PyQt5.QtGui import QColor, QImage
 from PyQt5.QtWidgets import QApplication
 
 # get directory to main.py
@@ -20,15 +25,13 @@ class testMain(unittest.TestCase):
 
     def test_video_table_defaults(self):
         """Test default content of self.video_table -- should be empty"""
-        row_count = 250
         column_count = 5
-        self.assertEqual(self.form.video_table.rowCount(), row_count)
-        self.assertEqual(self.form.video_table.columnCount(), column_count)
-
-        # ensure empty table upon start
-        for row in range(row_count):
-            for column in range(column_count):
-                self.assertEqual(self.form.video_table.item(row, column), None)
+        self.assertEqual(self.form.track_model.rowCount(), 0)
+        self.assertEqual(self.form.track_model.columnCount(), column_count)
+        header_labels = [self.form.track_model.headerData(column, Qt.Horizontal) for column in range(column_count)]
+        self.assertEqual(header_labels, ["song", "album", "artist", "genre", "artwork"])
+        header_font = self.form.track_model.headerData(0, Qt.Horizontal, Qt.FontRole)
+        self.assertEqual((header_font.family(), header_font.pointSize()), ("Arial", 13))
 
     def test_user_input_defaults(self):
         """Test default inputs for users."""
@@ -74,5 +77,124 @@ class testMain(unittest.TestCase):
         )
 
 
+class testUrlLoading(unittest.TestCase):
+    """Test loading a url while another url loads."""
+
+    def setUp(self):
+        self.form = main.MainPage()
+        self.old_load_gate = threading.Event()
+
+    def iter_youtube_content(self, youtube_url, override_error, failures=None):
+        """Example loader - the old url yields its second batch once gated"""
+        if youtube_url == "old":
+            yield {"old1": {"title": "Roxanne", "id": "old1", "duration": 192}}
+            self.old_load_gate.wait()
+            yield {"old2": {"title": "So Lonely", "id": "old2", "duration": 290}}
+        else:
+            yield {"new1": {"title": "Message in a Bottle", "id": "new1", "duration": 291}}
+
+    def load_url(self, url):
+        self.form.url_input.setText(url)
+        self.form.url_loading_button_click()
+        return self.form.url_load
+
+    def test_reload_drops_stale_rows(self):
+        """Test rows of a superseded load do not reach the new table"""
+        with mock.patch("main.utils.iter_youtube_content", self.iter_youtube_content, create=True):
+            old_load = self.load_url("old")
+            while self.form.track_model.rowCount() == 0:
+                app.processEvents()
+            new_load = self.load_url("new")
+            self.old_load_gate.set()
+            self.assertTrue(old_load.wait(5000))
+            self.assertTrue(new_load.wait(5000))
+            app.processEvents()
+        self.assertEqual(self.form.track_model.track_store.ids, ["new1"])
+        self.assertEqual(list(self.form.videos_dict), ["new1"])
+
+
+class testArtworkPreviews(unittest.TestCase):
+    """Test the pooled artwork preview loader of the GUI."""
+
+    def setUp(self):
+        image = QImage(60, 60, QImage.Format_RGB32)
+        image.fill(QColor("red"))
+        png_bytes = QByteArray()
+        png_buffer = QBuffer(png_bytes)
+        png_buffer.open(QIODevice.WriteOnly)
+        image.save(png_buffer, "PNG")
+        self.png = bytes(png_bytes)
+        self.fetched = []
+        self.release = threading.Event()
+        self.release.set()
+        self.patch = mock.patch.object(main.utils, "get_artwork", side_effect=self.get_artwork, create=True)
+        self.patch.start()
+        self.previews = main.ArtworkPreviews(QSize(30, 30), workers=1, cache_size=2)
+        self.displayed = []
+        self.previews.previewLoaded.connect(self.displayed.append)
+
+    def get_artwork(self, artwork_url):
+        self.fetched.append(artwork_url)
+        self.release.wait(5)
+        return self.png
+
+    def finish_loads(self):
+        self.previews.pool.waitForDone()
+        app.processEvents()  # deliver imageLoaded of the pool threads
+
+    def test_cached_preview(self):
+        """Test a loaded preview is displayed again without a fetch, and old previews are evicted"""
+        self.previews.request("https://a/1")
+        self.finish_loads()
+        self.assertEqual(self.displayed[-1].size(), QSize(30, 30))
+        self.previews.request("https://a/1")  # displayed at once
+        self.assertEqual(len(self.displayed), 2)
+        self.assertEqual(self.fetched, ["https://a/1"])
+
+        self.previews.request("https://a/2", ["https://a/3"])
+        self.finish_loads()
+        self.previews.request("https://a/1")
+        self.finish_loads()
+        self.assertEqual(self.fetched, ["https://a/1", "https://a/2", "https://a/3", "https://a/1"])
+
+    def test_superseded_load_dropped(self):
+        """Test queued loads of a superseded request are dropped and running ones not displayed"""
+        self.release.clear()
+        self.previews.request("https://a/slow")
+        self.previews.request("https://a/1")  # queued behind the slow load
+        self.previews.request("https://a/2")
+        self.release.set()
+        self.finish_loads()
+        self.assertEqual(self.fetched, ["https://a/slow", "https://a/2"])
+        self.assertEqual(len(self.displayed), 1)
+        self.assertEqual(self.previews.requested_url, "https://a/2")
+        # a finished load is not taken back by the next request
+        self.previews.request("https://a/3", ["https://a/4"])
+        self.previews.pool.waitForDone()
+        self.previews.request("https://a/5")
+        self.finish_loads()
+
+    def test_prefetch_order(self):
+        """Test neighbouring rows are loaded nearest first, behind the requested row"""
+        form = main.MainPage()
+        form.videos_dict = {}
+        form._url_rows_loaded({str(row): {"title": f"Video {row}", "id": str(row), "duration": 60} for row in range(6)})
+        form.track_model.track_store.artwork[:] = [f"https://a/{row}" for row in range(6)]
+        with mock.patch.object(form.artwork_previews, "request") as request:
+            form.load_table_content(1, 0)
+        request.assert_called_once_with("https://a/1", ["https://a/2", "https://a/0", "https://a/3", "https://a/4"])
+
+        self.release.clear()
+        self.previews.request("https://a/1", ["https://a/2", "https://a/0", "https://a/3"])
+        self.release.set()
+        self.finish_loads()
+        self.assertEqual(self.fetched, ["https://a/1", "https://a/2", "https://a/0", "https://a/3"])
+
+    def tearDown(self):
+        self.release.set()
+        self.previews.shutdown()
+        self.patch.stop()
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
@@ -0,0 +1,59 @@
+"""Test cold start import time of utils and the GUI."""
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Cumulative import time budgets in milliseconds - generous for slow CI runners.
+IMPORT_BUDGETS = {"utils": 50, "utils.cli": 250, "main": 500}
+# Dependencies that must only be imported once the function needing them runs.
+HEAVY_MODULES = ("moviepy", "pytubefix", "pytube", "youtube_dl", "mutagen", "itunespy", "requests")
+
+
+def get_import_time(module_name, runs=3):
+    """Get best cumulative `python -X importtime` milliseconds of a cold
+    import of module_name over a few fresh interpreters."""
+    import_times = []
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        # e.g. "import time:       389 |        389 | utils"
+        match = re.search(rf"^import time:\s*\d+ \|\s*(\d+) \| {re.escape(module_name)}$", process.stderr, re.M)
+        import_times.append(int(match.group(1)) / 1000)
+    return min(import_times)
+
+
+class testStartup(unittest.TestCase):
+    """Test startup time budget of utils/ and main.py"""
+
+    def test_import_time_budget(self):
+        """Test cold import of each entry point stays within budget"""
+        for module_name, budget in IMPORT_BUDGETS.items():
+            with self.subTest(module=module_name):
+                self.assertLess(get_import_time(module_name), budget)
+
+    def test_heavy_modules_deferred(self):
+        """Test importing utils and main does not import heavy dependencies"""
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                f"import sys, utils, utils.cli, main; print([m for m in {HEAVY_MODULES} if m in sys.modules])",
+            ],
+            cwd=BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(process.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
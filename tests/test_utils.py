@@ -1,11 +1,53 @@
 """Test functions in utils/ directory"""
+
+import json
 import os
+import subprocess
 import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import time
 import unittest
+from unittest import mock
+
+import requests
 
 # get base directory and import util files
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from utils import _threading, download_youtube, query_itunes, query_youtube
+from utils import (
+    _threading,
+    artwork_cache,
+    async_query,
+    cancellation,
+    cli,
+    download_youtube,
+    extract_audio,
+    http_client,
+    itunes_cache,
+    match_score,
+    normalize_title,
+    progress,
+    query_itunes,
+    query_youtube,
+    rate_limiter,
+    track_store,
+    transfer,
+    video_cache,
+)
+
+
+def setUpModule():
+    """Keep tests off the caches of the user in ~/.cache/youtube2audio."""
+    video_cache._video_cache = video_cache.VideoInfoCache(":memory:")
+    itunes_cache._search_cache = itunes_cache.SearchCache(query_itunes.fetch_search_results, ":memory:")
+
+
+def tearDownModule():
+    video_cache._video_cache.close()
+    video_cache._video_cache = None
+    itunes_cache._search_cache.close()
+    itunes_cache._search_cache = None
 
 
 class testThreading(unittest.TestCase):
@@ -24,6 +66,58 @@ class testThreading(unittest.TestCase):
         total_value_sum_one = _threading.map_threads(self.example_func_for_threading, iterable)
         self.assertEqual(len(list(total_value_sum_one)), 500)
 
+    def test_map_stages(self):
+        """Test _threading.map_stages passes items through thread and process
+        stages, keeping input order and per-item exceptions"""
+
+        def check_value(value):
+            if value == 3:
+                raise ValueError("bad value")
+            return -value
+
+        stages = (
+            (check_value, 4, False),
+            (abs, 2, True),
+            (self.example_func_for_threading, 1, False),
+        )
+        results = _threading.map_stages(stages, range(50), queue_size=2)
+        self.assertEqual(len(results), 50)
+        self.assertIsInstance(results[3], ValueError)
+        self.assertEqual(results[:3] + results[4:], [value + 1 for value in range(50) if value != 3])
+
+    def test_map_stages_cancel(self):
+        """Test cancelling fails items not yet past the last but one stage"""
+        cancel_token = cancellation.CancelToken()
+
+        def cancel_at_five(value):
+            if value == 5:
+                cancel_token.cancel()
+            return value
+
+        stages = ((cancel_at_five, 1, False), (self.example_func_for_threading, 1, False))
+        results = _threading.map_stages(stages, range(10), cancel_token=cancel_token)
+        # items past the first stage finish
+        self.assertEqual(results[:6], [value + 1 for value in range(6)])
+        self.assertTrue(all(isinstance(result, cancellation.Cancelled) for result in results[6:]))
+
+    def test_map_stages_pause(self):
+        """Test pausing holds items back until resumed"""
+        cancel_token = cancellation.CancelToken()
+        cancel_token.pause()
+        started = []
+        results = []
+        stages = ((started.append, 2, False), (abs, 1, False))
+        thread = threading.Thread(
+            target=lambda: results.extend(_threading.map_stages(stages, range(4), cancel_token=cancel_token))
+        )
+        thread.start()
+        time.sleep(0.1)
+        self.assertEqual(started, [])
+        cancel_token.resume()
+        thread.join(5)
+        self.assertEqual(sorted(started), [0, 1, 2, 3])
+        self.assertEqual(len(results), 4)
+
 
 class testYouTubeQuery(unittest.TestCase):
     """Test utils/youtube_query.py"""
@@ -98,6 +192,17 @@ class testYouTubeQuery(unittest.TestCase):
         video_list_to_dict = query_youtube.video_content_to_dict(self.video_info_list)
         self.assertIsInstance(video_list_to_dict, dict)
 
+    def test_video_content_to_dict_duplicate_titles(self):
+        """Test videos sharing a title are keyed by video id and keep a row each"""
+        video_info_list = [
+            {"title": "Roxanne", "id": "3T1c7GkzRQQ", "duration": 195},
+            None,
+            {"title": "Roxanne", "id": "FFwqbtF1b0g", "duration": 240},
+        ]
+        video_list_to_dict = query_youtube.video_content_to_dict(video_info_list)
+        self.assertEqual(list(video_list_to_dict), ["3T1c7GkzRQQ", "FFwqbtF1b0g"])
+        self.assertEqual(video_list_to_dict["FFwqbtF1b0g"]["title"], "Roxanne")
+
 
 class testiTunesQuery(unittest.TestCase):
     """Test utils/itunes_query.py"""
@@ -127,6 +232,40 @@ class testiTunesQuery(unittest.TestCase):
         itunes_meta_data = query_itunes.get_itunes_metadata(self.video_url_for_oembed)
         self.assertIsInstance(itunes_meta_data, dict)
 
+    def test_get_itunes_metadata_artwork_url_only(self):
+        """Test annotation returns the artwork url without fetching artwork"""
+        track = mock.Mock(
+            track_name="Roxanne",
+            collection_name="Outlandos d'Amour",
+            artist_name="The Police",
+            primary_genre_name="Rock",
+            artwork_url_60="https://is1-ssl.mzstatic.com/image/thumb/60x60bb.jpg",
+        )
+        with mock.patch.object(query_itunes, "oembed_title", return_value="The Police - Roxanne"), mock.patch.object(
+            query_itunes, "query_itunes", return_value=[track]
+        ), mock.patch.object(artwork_cache.artwork_cache, "fetch") as fetch:
+            itunes_meta_data = query_itunes.get_itunes_metadata(self.video_url_for_oembed)
+        fetch.assert_not_called()
+        self.assertEqual(
+            itunes_meta_data["artwork_url_fullres"], "https://is1-ssl.mzstatic.com/image/thumb/600x600bb.jpg"
+        )
+        self.assertNotIn("artwork_bytes_fullres", itunes_meta_data)
+
+    def test_get_itunes_metadata_loaded_title(self):
+        """Test a loaded title is normalized and skips the oEmbed request"""
+        with mock.patch.object(query_itunes, "oembed_title") as oembed_title, mock.patch.object(
+            query_itunes, "query_itunes", return_value=None
+        ) as query:
+            itunes_meta_data = query_itunes.get_itunes_metadata(
+                self.video_url_for_oembed, "The Police - Roxanne (Official Music Video)"
+            )
+        self.assertIsNone(itunes_meta_data)
+        oembed_title.assert_not_called()
+        self.assertEqual(
+            query.call_args_list,
+            [mock.call("The Police Roxanne"), mock.call("The Police - Roxanne (Official Music Video)")],
+        )
+
     def test_oembed_title_non_url(self):
         """Test converting a non-url string to oembed. Should raise
         TypeError"""
@@ -147,6 +286,116 @@ class testiTunesQuery(unittest.TestCase):
         self.assertIsInstance(itunes_query_results, list)
 
 
+class testNormalizeTitle(unittest.TestCase):
+    """Test utils/normalize_title.py"""
+
+    def test_parse_title(self):
+        """Test noise removal and artist, track and featured artist split"""
+        titles = {
+            "The Police - Roxanne (Official Music Video) [HD]": ("The Police", "Roxanne", []),
+            "Mark Ronson - Uptown Funk (feat. Bruno Mars)": ("Mark Ronson", "Uptown Funk", ["Bruno Mars"]),
+            "Jay-Z - Empire State of Mind ft. Alicia Keys": ("Jay-Z", "Empire State of Mind", ["Alicia Keys"]),
+            'Adele - "Hello" Official Video HD': ("Adele", "Hello", []),
+            "Daft Punk – Get Lucky (Lyrics)": ("Daft Punk", "Get Lucky", []),
+            "Roxanne | The Police": ("", "Roxanne", []),
+            "Kanye West ft. Jay-Z - Otis": ("Kanye West", "Otis", ["Jay-Z"]),
+            "Calvin Harris feat. Rihanna - This Is What You Came For (Official Video)": (
+                "Calvin Harris",
+                "This Is What You Came For",
+                ["Rihanna"],
+            ),
+        }
+        for title, (artist, track, featuring) in titles.items():
+            with self.subTest(title=title):
+                self.assertEqual(
+                    normalize_title.parse_title(title), {"artist": artist, "track": track, "featuring": featuring}
+                )
+
+    def test_get_search_term(self):
+        """Test search terms join artist and track"""
+        search_term = normalize_title.get_search_term("Bob Marley - Blackman Redemption")
+        self.assertEqual(search_term, "Bob Marley Blackman Redemption")
+        self.assertEqual(normalize_title.get_search_term("Kanye West ft. Jay-Z - Otis"), "Kanye West Otis")
+        self.assertEqual(normalize_title.get_search_term("(Official Video)"), "(Official Video)")
+
+
+class testMatchScore(unittest.TestCase):
+    """Test utils/match_score.py"""
+
+    def setUp(self):
+        from itunespy.track import Track
+
+        def track(track_name, artist_name, collection_name, seconds):
+            return Track(
+                {
+                    "kind": "song",
+                    "trackName": track_name,
+                    "artistName": artist_name,
+                    "collectionName": collection_name,
+                    "trackTimeMillis": seconds * 1000,
+                }
+            )
+
+        self.tracks = query_itunes.set_track_minutes(
+            [
+                track("Roxanne (Karaoke Version)", "Sing Along Band", "Karaoke Hits 1978", 190),
+                track("Roxanne", "The Police", "The Very Best of Sting & The Police", 192),
+                track("Roxanne", "The Police", "Outlandos d'Amour", 192),
+                track("Roxanne", "The Police", "Live at the Hollywood Bowl", 422),
+            ]
+        )
+
+    def test_best_match(self):
+        """Test the studio album track beats compilations, covers and live versions"""
+        score, track = match_score.best_match("The Police - Roxanne (Official Music Video)", 195, self.tracks)
+        self.assertEqual(track.collection_name, "Outlandos d'Amour")
+        self.assertGreater(score, match_score.LOW_CONFIDENCE)
+
+    def test_version_suffix_candidate(self):
+        """Test a " - Remastered" album track beats live and compilation versions"""
+        from itunespy.track import Track
+
+        tracks = query_itunes.set_track_minutes(
+            [
+                Track(
+                    {
+                        "kind": "song",
+                        "trackName": track_name,
+                        "artistName": "Queen",
+                        "collectionName": collection_name,
+                        "trackTimeMillis": seconds * 1000,
+                    }
+                )
+                for track_name, collection_name, seconds in [
+                    ("Bohemian Rhapsody (Live Aid)", "Bohemian Rhapsody (The Original Soundtrack)", 148),
+                    ("Bohemian Rhapsody", "Greatest Hits", 355),
+                    ("Bohemian Rhapsody - Remastered 2011", "A Night at the Opera (2011 Remaster)", 355),
+                ]
+            ]
+        )
+        self.assertEqual(match_score.similarity("Bohemian Rhapsody", "Bohemian Rhapsody - Remastered 2011"), 1.0)
+        score, track = match_score.best_match("Queen – Bohemian Rhapsody (Official Video Remastered)", 359, tracks)
+        self.assertEqual(track.track_name, "Bohemian Rhapsody - Remastered 2011")
+        self.assertGreater(score, 0.9)
+
+    def test_rank_candidates(self):
+        """Test every candidate is scored, best first"""
+        ranked = match_score.rank_candidates("Roxanne - The Police", 195, self.tracks)
+        self.assertEqual(len(ranked), 4)
+        self.assertEqual([score for score, _ in ranked], sorted((score for score, _ in ranked), reverse=True))
+        self.assertEqual(ranked[-1][1].artist_name, "Sing Along Band")
+
+    def test_low_confidence(self):
+        """Test a poor match is flagged in the iTunes metadata"""
+        score, track = match_score.best_match("Sting - Englishman In New York", 265, self.tracks)
+        itunes_meta_json = query_itunes.get_itunes_meta_json(
+            mock.Mock(artwork_url_60="https://is1-ssl.mzstatic.com/60x60bb.jpg", **vars(track)), score
+        )
+        self.assertLess(score, match_score.LOW_CONFIDENCE)
+        self.assertTrue(itunes_meta_json["low_confidence"])
+        self.assertEqual(itunes_meta_json["match_score"], round(score, 2))
+
+
 class testYouTubeDownload(unittest.TestCase):
     """Test utils/download_youtube.py"""
 
@@ -213,5 +462,988 @@ class testYouTubeDownload(unittest.TestCase):
     # TODO: add tests for mp3 and mp4 annotations -- above tests are for high-level functions.
 
 
+class FakeStream:
+    """Minimal stand-in for pytube Stream used in stream selection tests"""
+
+    def __init__(self, itag, abr, audio_codec, only_audio=True):
+        self.itag = itag
+        self.abr = abr
+        self.audio_codec = audio_codec
+        self.only_audio = only_audio
+
+
+class FakeStreamQuery:
+    """Minimal stand-in for pytube StreamQuery used in stream selection tests"""
+
+    def __init__(self, streams):
+        self.streams = streams
+
+    def filter(self, only_audio=False):
+        return [stream for stream in self.streams if stream.only_audio == only_audio]
+
+    def get_highest_resolution(self):
+        return next(stream for stream in self.streams if not stream.only_audio)
+
+
+class testStreamSelection(unittest.TestCase):
+    """Test download_youtube.select_stream"""
+
+    def setUp(self):
+        self.progressive = FakeStream(18, "96kbps", "mp4a.40.2", only_audio=False)
+        self.streams = FakeStreamQuery(
+            [
+                self.progressive,
+                FakeStream(139, "48kbps", "mp4a.40.5"),
+                FakeStream(140, "128kbps", "mp4a.40.2"),
+                FakeStream(250, "70kbps", "opus"),
+                FakeStream(251, "160kbps", "opus"),
+            ]
+        )
+
+    def test_select_stream_bitrate(self):
+        """Test highest audio-only bitrate at or below target is selected"""
+        self.assertEqual(download_youtube.select_stream(self.streams, target_abr=160).itag, 251)
+        self.assertEqual(download_youtube.select_stream(self.streams, target_abr=130).itag, 140)
+
+    def test_select_stream_above_target(self):
+        """Test lowest bitrate is selected when every stream exceeds target"""
+        self.assertEqual(download_youtube.select_stream(self.streams, target_abr=10).itag, 139)
+
+    def test_select_stream_preferred_codec(self):
+        """Test preferred codec outranks bitrate"""
+        stream = download_youtube.select_stream(self.streams, target_abr=160, preferred_codecs=("mp4a",))
+        self.assertEqual(stream.itag, 140)
+
+    def test_select_stream_progressive_fallback(self):
+        """Test fallback to progressive stream without audio-only streams"""
+        streams = FakeStreamQuery([self.progressive])
+        self.assertIs(download_youtube.select_stream(streams), self.progressive)
+        self.assertIs(download_youtube.select_stream(self.streams, audio_only=False), self.progressive)
+
+
+class testExtractAudio(unittest.TestCase):
+    """Test utils/extract_audio.py"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.mp4_filepath = os.path.join(self.tmp_dir.name, "fixture.mp4")
+        # generate a 2 second progressive MP4 (H.264 video + AAC audio) fixture
+        subprocess.run(
+            [
+                extract_audio.get_ffmpeg_exe(),
+                "-y",
+                "-v",
+                "error",
+                "-f",
+                "lavfi",
+                "-i",
+                "testsrc=size=160x120:rate=10:duration=2",
+                "-f",
+                "lavfi",
+                "-i",
+                "sine=frequency=440:sample_rate=44100:duration=2",
+                "-c:v",
+                "libx264",
+                "-c:a",
+                "aac",
+                self.mp4_filepath,
+            ],
+            check=True,
+        )
+
+    def test_extract_audio_m4a(self):
+        """Test remux of AAC audio to an M4A file without the video track"""
+        from mutagen.mp4 import MP4
+
+        m4a_filepath = extract_audio.extract_audio(self.mp4_filepath, os.path.join(self.tmp_dir.name, "song.m4a"))
+        audio = MP4(m4a_filepath)
+        self.assertTrue(audio.info.codec.startswith("mp4a"))
+        self.assertAlmostEqual(audio.info.length, 2, delta=0.2)
+        self.assertLess(os.path.getsize(m4a_filepath), os.path.getsize(self.mp4_filepath))
+
+    def test_extract_audio_mp3(self):
+        """Test transcode of audio track to an MP3 file"""
+        from mutagen.mp3 import MP3
+
+        mp3_filepath = extract_audio.extract_audio(self.mp4_filepath, os.path.join(self.tmp_dir.name, "song.mp3"))
+        self.assertAlmostEqual(MP3(mp3_filepath).info.length, 2, delta=0.2)
+
+    def test_transcode_and_tag_track(self):
+        """Test transcode and tag pipeline stages on a downloaded stream"""
+        from mutagen.mp3 import MP3
+
+        job = {
+            "source_path": self.mp4_filepath,
+            "download_path": self.tmp_dir.name,
+            "song_filename": "No Time This Time.mp3",
+            "song_properties": {
+                "song": "No Time This Time",
+                "album": "Reggatta de Blanc",
+                "artist": "The Police",
+                "genre": "Rock",
+                "artwork": "Unknown",
+            },
+            "save_as_mp4": False,
+        }
+        song_filepath = download_youtube.tag_track(download_youtube.transcode_track(job))
+        self.assertEqual(str(MP3(song_filepath).tags["TPE1"]), "The Police")
+
+    def test_extract_audio_invalid_source(self):
+        """Test FFmpeg failure is raised as RuntimeError"""
+        with self.assertRaises(RuntimeError):
+            extract_audio.extract_audio(
+                os.path.join(self.tmp_dir.name, "missing.mp4"), os.path.join(self.tmp_dir.name, "song.mp3")
+            )
+
+    def test_extract_audio_unsupported_extension(self):
+        """Test unsupported output extension raises ValueError"""
+        with self.assertRaises(ValueError):
+            extract_audio.extract_audio(self.mp4_filepath, os.path.join(self.tmp_dir.name, "song.wav"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+class testArtworkCache(unittest.TestCase):
+    """Test utils/artwork_cache.py"""
+
+    def setUp(self):
+        self.fetched_urls = []
+        self.tmp_dir = tempfile.TemporaryDirectory()
+
+    def fetch(self, artwork_url):
+        """Example fetcher returning 100 bytes per url"""
+        self.fetched_urls.append(artwork_url)
+        time.sleep(0.05)
+        return artwork_url[-1].encode() * 100
+
+    def test_cache_hit(self):
+        """Test repeated requests for one url fetch once"""
+        cache = artwork_cache.ArtworkCache(fetch=self.fetch)
+        for _ in range(3):
+            self.assertEqual(cache.get("https://a.com/1"), b"1" * 100)
+        self.assertEqual(self.fetched_urls, ["https://a.com/1"])
+
+    def test_non_url(self):
+        """Test non-url artwork cells return empty bytes without fetching"""
+        cache = artwork_cache.ArtworkCache(fetch=self.fetch)
+        self.assertEqual(cache.get("Unknown"), b"")
+        self.assertEqual(cache.get(None), b"")
+        self.assertEqual(self.fetched_urls, [])
+
+    def test_failed_fetch_not_cached(self):
+        """Test empty fetch results are refetched"""
+        cache = artwork_cache.ArtworkCache(fetch=lambda url: self.fetched_urls.append(url) or b"")
+        cache.get("https://a.com/1")
+        cache.get("https://a.com/1")
+        self.assertEqual(len(self.fetched_urls), 2)
+
+    def test_memory_lru_eviction(self):
+        """Test least recently used entries are evicted beyond byte budget"""
+        cache = artwork_cache.ArtworkCache(max_memory_bytes=250, fetch=self.fetch)
+        cache.get("https://a.com/1")
+        cache.get("https://a.com/2")
+        cache.get("https://a.com/1")  # 2 is now least recently used
+        cache.get("https://a.com/3")
+        cache.get("https://a.com/1")
+        cache.get("https://a.com/2")
+        self.assertEqual(
+            self.fetched_urls, ["https://a.com/1", "https://a.com/2", "https://a.com/3", "https://a.com/2"]
+        )
+
+    def test_disk_tier(self):
+        """Test disk tier serves a fresh cache and evicts beyond byte budget"""
+        cache = artwork_cache.ArtworkCache(disk_dir=self.tmp_dir.name, max_disk_bytes=250, fetch=self.fetch)
+        for index in range(1, 4):
+            cache.get(f"https://a.com/{index}")
+            time.sleep(0.01)  # distinct modification times
+        self.assertEqual(len(os.listdir(self.tmp_dir.name)), 2)
+
+        new_cache = artwork_cache.ArtworkCache(disk_dir=self.tmp_dir.name, max_disk_bytes=250, fetch=self.fetch)
+        self.assertEqual(new_cache.get("https://a.com/3"), b"3" * 100)
+        self.assertEqual(len(self.fetched_urls), 3)
+
+    def test_single_flight(self):
+        """Test concurrent requests for one url share a single fetch"""
+        cache = artwork_cache.ArtworkCache(fetch=self.fetch)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get("https://a.com/1"))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [b"1" * 100] * 8)
+        self.assertEqual(self.fetched_urls, ["https://a.com/1"])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """Local HTTP server handler serving `content` with Range support. Drops
+    the connection after `fail_after` bytes of the next `failures` responses
+    and throttles each connection to 32 KiB per `throttle_delay` seconds."""
+
+    content = bytes(range(256)) * 4096
+    fail_after = 0
+    failures = 0
+    throttle_delay = 0
+    ignore_range = False
+    requested_ranges = []
+
+    def do_GET(self):
+        start, end = 0, len(self.content) - 1
+        if "Range" in self.headers and not self.ignore_range:
+            start, end = (int(value) for value in self.headers["Range"].split("=")[1].split("-"))
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        type(self).requested_ranges.append((start, end))
+        body = self.content[start : end + 1]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.failures:
+            type(self).failures -= 1
+            self.wfile.write(body[: self.fail_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        for index in range(0, len(body), 32768):
+            self.wfile.write(body[index : index + 32768])
+            time.sleep(self.throttle_delay)
+
+    def log_message(self, *args):
+        pass
+
+
+class testResumableDownload(unittest.TestCase):
+    """Test utils/transfer.py"""
+
+    def setUp(self):
+        RangeRequestHandler.requested_ranges = []
+        RangeRequestHandler.failures = 0
+        RangeRequestHandler.fail_after = 300000
+        RangeRequestHandler.throttle_delay = 0
+        RangeRequestHandler.ignore_range = False
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/stream"
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "song.mp4")
+        self.size = len(RangeRequestHandler.content)
+        self.journal_info = {"video_id": "nbXACcsTn84", "itag": 140}
+
+    def test_download_resumes_next_run(self):
+        """Test a failed download leaves a journal and a later run resumes from it"""
+        RangeRequestHandler.failures = 1
+        with self.assertRaises(RuntimeError):
+            transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, retries=0)
+        journal = transfer.read_journal(self.file_path)
+        self.assertEqual(journal["itag"], 140)
+        self.assertGreater(journal["bytes_written"], 0)
+
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, retries=0)
+        self.assertEqual(RangeRequestHandler.requested_ranges[-1][0], journal["bytes_written"])
+        with open(self.file_path, "rb") as song_file:
+            self.assertEqual(song_file.read(), RangeRequestHandler.content)
+        self.assertTrue(transfer.read_journal(self.file_path)["complete"])
+
+    def test_completed_download_of_other_stream(self):
+        """Test a completed file of the same size is reused only for the same stream"""
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info)
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info)
+        self.assertEqual(len(RangeRequestHandler.requested_ranges), 1)
+
+        transfer.download_resumable(self.url, self.file_path, self.size, {"video_id": "aq4wN2IwSaE", "itag": 140})
+        self.assertEqual(len(RangeRequestHandler.requested_ranges), 2)
+        self.assertEqual(transfer.read_journal(self.file_path)["video_id"], "aq4wN2IwSaE")
+
+    def test_same_title_downloads(self):
+        """Test videos sharing a title download to separate streams and audio files"""
+        self.assertEqual(
+            download_youtube.get_unique_filenames(["Roxanne", "roxanne", "Roxanne", "Message in a Bottle"]),
+            ["Roxanne", "roxanne (2)", "Roxanne (3)", "Message in a Bottle"],
+        )
+        stream = mock.Mock(url=self.url, filesize=self.size, subtype="mp4", itag=140)
+        jobs = []
+        with mock.patch("pytubefix.YouTube"), mock.patch.object(download_youtube, "select_stream", return_value=stream):
+            for video_id, filename in zip(["nbXACcsTn84", "aq4wN2IwSaE"], ["Roxanne", "Roxanne (2)"]):
+                args = (
+                    ("Roxanne - The Police", {"id": video_id, "duration": 192}),
+                    (self.tmp_dir.name, self.tmp_dir.name),
+                    {"song": "Roxanne"},
+                    False,
+                )
+                jobs.append(download_youtube.download_track(args, filename=filename))
+        self.assertEqual(
+            [job["source_path"] for job in jobs],
+            [os.path.join(self.tmp_dir.name, f"{video_id}-140.mp4") for video_id in ["nbXACcsTn84", "aq4wN2IwSaE"]],
+        )
+        self.assertEqual([job["song_filename"] for job in jobs], ["Roxanne.mp3", "Roxanne (2).mp3"])
+        self.assertEqual(len(RangeRequestHandler.requested_ranges), 2)
+
+    def test_download_retries_from_offset(self):
+        """Test a dropped connection is retried from the last good offset"""
+        RangeRequestHandler.failures = 1
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, retries=1)
+        self.assertEqual(len(RangeRequestHandler.requested_ranges), 2)
+        self.assertGreater(RangeRequestHandler.requested_ranges[1][0], 0)
+        with open(self.file_path, "rb") as song_file:
+            self.assertEqual(song_file.read(), RangeRequestHandler.content)
+
+    def test_download_mismatched_journal(self):
+        """Test partial data of another stream is discarded"""
+        RangeRequestHandler.failures = 1
+        with self.assertRaises(RuntimeError):
+            transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, retries=0)
+        transfer.download_resumable(self.url, self.file_path, self.size, {"video_id": "nbXACcsTn84", "itag": 251})
+        self.assertEqual(RangeRequestHandler.requested_ranges[-1][0], 0)
+        with open(self.file_path, "rb") as song_file:
+            self.assertEqual(song_file.read(), RangeRequestHandler.content)
+
+    def test_download_cancelled(self):
+        """Test a cancelled download stops between chunks and removes its partial data"""
+        cancel_token = cancellation.CancelToken()
+        with self.assertRaises(cancellation.Cancelled):
+            transfer.download_resumable(
+                self.url,
+                self.file_path,
+                self.size,
+                self.journal_info,
+                segments=2,
+                on_progress=lambda bytes_received, bytes_total: cancel_token.cancel(),
+                cancel_token=cancel_token,
+            )
+        # one request per segment - cancelled segments are not retried
+        self.assertLessEqual(len(RangeRequestHandler.requested_ranges), 2)
+        self.assertEqual(os.listdir(self.tmp_dir.name), [])
+
+    def test_get_segment_count(self):
+        """Test segment count scales with stream filesize"""
+        self.assertEqual(transfer.get_segment_count(1000, segment_size=4000), 1)
+        self.assertEqual(transfer.get_segment_count(10000, segment_size=4000), 3)
+        self.assertEqual(transfer.get_segment_count(10**9, segment_size=4000, max_segments=8), 8)
+
+    def test_segmented_download_throttled(self):
+        """Test segments fetched concurrently beat one throttled connection"""
+        RangeRequestHandler.throttle_delay = 0.02
+        time0 = time.perf_counter()
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, segments=1)
+        single_time = time.perf_counter() - time0
+        os.remove(self.file_path)
+
+        time0 = time.perf_counter()
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, segments=4)
+        segmented_time = time.perf_counter() - time0
+        self.assertLess(segmented_time, single_time * 0.75)
+        self.assertEqual(len(RangeRequestHandler.requested_ranges), 5)
+        with open(self.file_path, "rb") as song_file:
+            self.assertEqual(song_file.read(), RangeRequestHandler.content)
+
+    def test_segmented_download_resumes(self):
+        """Test a failed segment resumes from its own offset"""
+        RangeRequestHandler.failures = 1
+        RangeRequestHandler.fail_after = 100000
+        with self.assertRaises(RuntimeError):
+            transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, segments=4, retries=0)
+        journal = transfer.read_journal(self.file_path)
+        self.assertEqual(len(journal["segments"]), 4)
+        self.assertEqual(journal["bytes_written"], sum(segment[2] for segment in journal["segments"]))
+
+        RangeRequestHandler.requested_ranges = []
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, segments=4, retries=0)
+        self.assertEqual(len(RangeRequestHandler.requested_ranges), 1)
+        with open(self.file_path, "rb") as song_file:
+            self.assertEqual(song_file.read(), RangeRequestHandler.content)
+
+    def test_segmented_download_range_not_supported(self):
+        """Test fallback to a single connection if the server ignores Range"""
+        RangeRequestHandler.ignore_range = True
+        transfer.download_resumable(self.url, self.file_path, self.size, self.journal_info, segments=4)
+        with open(self.file_path, "rb") as song_file:
+            self.assertEqual(song_file.read(), RangeRequestHandler.content)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+
+class testDownloadProgress(unittest.TestCase):
+    """Test utils/progress.py"""
+
+    def setUp(self):
+        self.summaries = []
+
+    def test_progress_stages(self):
+        """Test stage and failure events reported by map_stages"""
+        tracker = progress.DownloadProgress(3, self.summaries.append, interval=0)
+
+        def fail_second(value):
+            if value == 1:
+                raise RuntimeError from ValueError("video unavailable")
+            return value
+
+        stages = ((fail_second, 2, False), (abs, 1, False), (abs, 1, False))
+        _threading.map_stages(stages, range(3), report=tracker.stage)
+        summary = self.summaries[-1]
+        self.assertEqual((summary["completed"], summary["failed"], summary["total"]), (2, 1, 3))
+        self.assertEqual(tracker.tracks[1]["error"], "video unavailable")
+        self.assertEqual(tracker.tracks[0]["stage"], "done")
+
+    def test_progress_cancelled(self):
+        """Test cancelled tracks are counted apart from failed ones"""
+        tracker = progress.DownloadProgress(2, self.summaries.append, interval=0)
+        tracker.stage(0, len(progress.STAGES))
+        tracker.stage(1, 0, cancellation.Cancelled())
+        summary = self.summaries[-1]
+        self.assertEqual((summary["completed"], summary["failed"], summary["cancelled"]), (1, 0, 1))
+        self.assertIsNone(tracker.tracks[1]["error"])
+
+    def test_progress_throttled(self):
+        """Test reports are throttled but the final report is always sent"""
+        tracker = progress.DownloadProgress(2, self.summaries.append, interval=60)
+        for index in range(2):
+            for bytes_received in range(0, 1001, 100):
+                tracker.received(index, bytes_received, 1000)
+            tracker.stage(index, len(progress.STAGES))
+        self.assertEqual(len(self.summaries), 2)
+        self.assertEqual(set(self.summaries[-1]["tracks"]), {0, 1})
+        self.assertEqual(self.summaries[-1]["bytes_received"], 2000)
+
+    def test_progress_eta(self):
+        """Test ETA extrapolates from started tracks to the whole playlist"""
+        tracker = progress.DownloadProgress(4, interval=0)
+        time.sleep(0.05)
+        tracker.received(0, 500, 1000)
+        summary = tracker.summary()
+        self.assertGreater(summary["throughput"], 0)
+        self.assertAlmostEqual(summary["eta"], 3500 / summary["throughput"], delta=0.5)
+
+
+class testCli(unittest.TestCase):
+    """Test utils/cli.py"""
+
+    def test_cli_does_not_import_qt(self):
+        """Test the headless entry point starts without importing PyQt5"""
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        process = subprocess.run(
+            [sys.executable, "-c", "import sys, utils.cli; print('PyQt5' in sys.modules)"],
+            cwd=base_dir,
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(process.stdout.strip(), "False")
+
+    def test_read_url_file(self):
+        """Test URL file parsing skips blank lines and comments"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as url_file:
+            url_file.write(
+                "# playlists\nhttps://www.youtube.com/watch?v=a  # song\n\nhttps://www.youtube.com/watch?v=b\n"
+            )
+        try:
+            self.assertEqual(
+                cli.read_url_file(url_file.name),
+                ["https://www.youtube.com/watch?v=a", "https://www.youtube.com/watch?v=b"],
+            )
+        finally:
+            os.remove(url_file.name)
+
+    def test_get_song_properties(self):
+        """Test song properties default to video title without annotation"""
+        song_properties = cli.get_song_properties("AC/DC - Thunderstruck")
+        self.assertEqual(song_properties["song"], "AC-DC - Thunderstruck")
+        self.assertEqual(song_properties["artwork"], "Unknown")
+
+    def test_main_without_urls(self):
+        """Test exit status without any URL"""
+        self.assertEqual(cli.main(["-q"]), 2)
+
+
+class FlakyRequestHandler(BaseHTTPRequestHandler):
+    """Local HTTP server handler answering 503 to the first `failures` requests."""
+
+    failures = 0
+    request_count = 0
+
+    def do_GET(self):
+        type(self).request_count += 1
+        if self.failures:
+            type(self).failures -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+class testHttpClient(unittest.TestCase):
+    """Test utils/http_client.py"""
+
+    def setUp(self):
+        FlakyRequestHandler.failures = 0
+        FlakyRequestHandler.request_count = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyRequestHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+
+    def test_shared_session(self):
+        """Test one session is shared and only rebuilt for a larger pool"""
+        session = http_client.get_session()
+        self.assertIs(http_client.get_session(), session)
+        self.assertIs(http_client.get_session(1), session)
+        larger_session = http_client.get_session(http_client._pool_size + 1)
+        self.assertIsNot(larger_session, session)
+        self.assertIs(http_client.get_session(), larger_session)
+
+    def test_retry_server_error(self):
+        """Test server errors are retried with backoff"""
+        FlakyRequestHandler.failures = 2
+        response = http_client.get(self.url)
+        self.assertEqual(response.content, b"ok")
+        self.assertEqual(FlakyRequestHandler.request_count, 3)
+
+    def test_retries_exhausted(self):
+        """Test the last response is returned once retries are exhausted"""
+        FlakyRequestHandler.failures = 10
+        session = http_client.create_session(retries=1)
+        self.assertEqual(session.get(self.url, timeout=http_client.TIMEOUT).status_code, 503)
+        self.assertEqual(FlakyRequestHandler.request_count, 2)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class testVideoInfoCache(unittest.TestCase):
+    """Test utils/video_cache.py"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = video_cache.VideoInfoCache(os.path.join(self.tmp_dir.name, "videos.sqlite3"))
+        self.video_info = {
+            "title": "No Time This Time - The Police",
+            "id": "nbXACcsTn84",
+            "duration": 198,
+            "description": "not cached",
+            "formats": [{"format_id": "140", "ext": "m4a", "acodec": "mp4a.40.2", "url": "not cached"}],
+        }
+
+    def test_put_get(self):
+        """Test only used fields are cached and read back by video id"""
+        self.cache.put(self.video_info)
+        cached_info = self.cache.get("nbXACcsTn84")
+        self.assertEqual(cached_info["duration"], 198)
+        self.assertNotIn("description", cached_info)
+        self.assertEqual(cached_info["formats"][0]["acodec"], "mp4a.40.2")
+        self.assertNotIn("url", cached_info["formats"][0])
+        self.assertIsNone(self.cache.get("woG54UNJRrE"))
+
+    def test_ttl(self):
+        """Test expired entries are not returned"""
+        self.cache.put(self.video_info)
+        self.cache.ttl = -1
+        self.assertIsNone(self.cache.get("nbXACcsTn84"))
+
+    def test_get_video_id(self):
+        """Test video id parsing of watch and short urls"""
+        self.assertEqual(video_cache.get_video_id("https://www.youtube.com/watch?v=nbXACcsTn84&t=1"), "nbXACcsTn84")
+        self.assertEqual(video_cache.get_video_id("https://youtu.be/nbXACcsTn84"), "nbXACcsTn84")
+        self.assertIsNone(video_cache.get_video_id("https://www.youtube.com/playlist?list=OLAK5uy"))
+
+    def test_get_video_info_cached(self):
+        """Test query_youtube.get_video_info serves cached metadata without a fetch"""
+        self.cache.put(self.video_info)
+        with mock.patch.object(video_cache, "_video_cache", self.cache):
+            video_info = query_youtube.get_video_info(("https://www.youtube.com/watch?v=nbXACcsTn84", False))
+        self.assertEqual(video_info["title"], "No Time This Time - The Police")
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+
+class testSearchCache(unittest.TestCase):
+    """Test utils/itunes_cache.py"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "itunes.sqlite3")
+        self.searched = []
+        self.release = threading.Event()
+        self.release.set()
+        self.cache = itunes_cache.SearchCache(self.search, self.path)
+
+    def search(self, term):
+        self.searched.append(term)
+        self.release.wait()
+        if term == "fail":
+            raise ConnectionError(term)
+        return [{"trackName": term}]
+
+    def test_cache_hit_normalized(self):
+        """Test queries differing in case and whitespace share one search"""
+        self.assertEqual(self.cache.get("The Police  Roxanne"), [{"trackName": "The Police  Roxanne"}])
+        self.assertEqual(self.cache.get(" the police roxanne"), [{"trackName": "The Police  Roxanne"}])
+        self.assertEqual(len(self.searched), 1)
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1, "coalesced": 0})
+
+    def test_persistence_and_ttl(self):
+        """Test cached searches survive a new cache instance until they expire"""
+        self.cache.get("Roxanne")
+        self.cache.close()
+        self.cache = itunes_cache.SearchCache(self.search, self.path)
+        self.cache.get("Roxanne")
+        self.assertEqual(len(self.searched), 1)
+        self.cache.ttl = -1
+        self.cache.get("Roxanne")
+        self.assertEqual(len(self.searched), 2)
+
+    def test_failed_search_not_cached(self):
+        """Test search exceptions propagate and are retried next time"""
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                self.cache.get("fail")
+        self.assertEqual(len(self.searched), 2)
+
+    def test_coalescing(self):
+        """Test concurrent identical queries hit search once"""
+        self.release.clear()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get("Roxanne"))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        while self.cache.stats()["coalesced"] < 4:
+            time.sleep(0.01)
+        self.release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.searched), 1)
+        self.assertEqual(results, [[{"trackName": "Roxanne"}]] * 5)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp_dir.cleanup()
+
+
+class testFlatPlaylist(unittest.TestCase):
+    """Test flat playlist loading in utils/query_youtube.py"""
+
+    def test_flat_playlist_info(self):
+        """Test playlist pages give videos in order and only incomplete entries are fetched"""
+        playlist_info = {
+            "entries": [
+                {"_type": "url", "id": "nbXACcsTn84", "title": "No Time This Time", "duration": 198},
+                {"_type": "url", "id": "woG54UNJRrE", "title": "[Private video]", "duration": None},
+                {"_type": "url", "id": "Kx1CsSIJA1A", "title": "Walking On The Moon", "duration": 301},
+            ]
+        }
+        ydl = mock.MagicMock()
+        ydl.__enter__.return_value.extract_info.return_value = playlist_info
+        fetched = {"title": "Private video", "id": "woG54UNJRrE", "duration": 200}
+        with mock.patch("youtube_dl.YoutubeDL", return_value=ydl), mock.patch.object(
+            query_youtube, "get_video_info", return_value=fetched
+        ) as get_video_info:
+            videos_dict = query_youtube.get_youtube_content("https://www.youtube.com/playlist?list=PL", True)
+        get_video_info.assert_called_once_with(("https://www.youtube.com/watch?v=woG54UNJRrE", True, True))
+        self.assertEqual(list(videos_dict), ["nbXACcsTn84", "woG54UNJRrE", "Kx1CsSIJA1A"])
+        self.assertEqual(
+            videos_dict["Kx1CsSIJA1A"], {"title": "Walking On The Moon", "id": "Kx1CsSIJA1A", "duration": 301}
+        )
+
+    def test_video_batches_in_playlist_order(self):
+        """Test batches are yielded in playlist order while fetches complete out of order"""
+
+        def get_video_info(args):
+            index = int(args[0])
+            time.sleep((6 - index) * 0.02)  # later videos load first
+            return {"title": f"Video {index}", "id": args[0], "duration": 60}
+
+        video_slots = [("0", False), {"title": "Video 1", "id": "1", "duration": 60}, ("2", False)]
+        video_slots += [(str(index), False) for index in range(3, 6)]
+        with mock.patch.object(query_youtube, "get_video_info", side_effect=get_video_info):
+            batches = list(query_youtube.iter_video_batches(video_slots, batch_size=4))
+        self.assertEqual([list(batch) for batch in batches], [[str(i) for i in range(4)], ["4", "5"]])
+
+    def test_video_batches_retry_and_failures(self):
+        """Test transient errors are retried per video and failures are collected"""
+        attempts = []
+
+        def get_video_info(args):
+            attempts.append(args[0])
+            if args[0] == "private":
+                raise RuntimeError("ERROR: Private video")
+            if args[0] == "flaky" and attempts.count("flaky") < 3:
+                raise RuntimeError("HTTP Error 503")
+            return {"title": args[0], "id": args[0], "duration": 60}
+
+        video_slots = [("flaky", False), ("private", False), ("ok", False)]
+        failures = {}
+        with mock.patch.object(query_youtube, "get_video_info", side_effect=get_video_info), mock.patch.object(
+            query_youtube, "RETRY_BACKOFF", 0.01
+        ):
+            batches = list(query_youtube.iter_video_batches(video_slots, failures=failures))
+            with self.assertRaises(RuntimeError):
+                list(query_youtube.iter_video_batches([("private", False)]))
+        self.assertEqual([list(batch) for batch in batches], [["flaky", "ok"]])
+        self.assertEqual(failures, {"private": "ERROR: Private video"})
+        # private videos are not retried, flaky ones until loaded
+        self.assertEqual(attempts.count("private"), 2)
+        self.assertEqual(attempts.count("flaky"), 3)
+
+
+class ThrottlingSearchHandler(BaseHTTPRequestHandler):
+    """Local iTunes Search API and oEmbed stand-in answering 429 to the first
+    `throttled` requests."""
+
+    throttled = 0
+    request_count = 0
+    results = [{"trackName": "Roxanne"}]
+
+    def do_GET(self):
+        type(self).request_count += 1
+        if self.throttled:
+            type(self).throttled -= 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/oembed"):
+            content = json.dumps({"title": "The Police - Roxanne (Official Music Video)"}).encode()
+        else:
+            content = json.dumps({"resultCount": len(self.results), "results": self.results}).encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class testRateLimiter(unittest.TestCase):
+    """Test utils/rate_limiter.py and throttled iTunes searches"""
+
+    def setUp(self):
+        ThrottlingSearchHandler.throttled = 0
+        ThrottlingSearchHandler.request_count = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingSearchHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/search"
+
+    def test_token_bucket_rate(self):
+        """Test calls beyond the burst are spaced at the rate across threads"""
+        limiter = rate_limiter.RateLimiter(rate=20, burst=2)
+        start = time.monotonic()
+        threads = [threading.Thread(target=limiter.acquire) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_backoff_and_recovery(self):
+        """Test backoff pauses callers and halves the rate until successes restore it"""
+        limiter = rate_limiter.RateLimiter(rate=100, burst=1)
+        limiter.backoff(0.2)
+        self.assertEqual(limiter.rate, 50)
+        start = time.monotonic()
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+        for _ in range(10):
+            limiter.success()
+        self.assertEqual(limiter.rate, 100)
+
+    def test_no_burst_after_backoff(self):
+        """Test calls resume one by one at the halved rate once a backoff ends"""
+        limiter = rate_limiter.RateLimiter(rate=100, burst=5)
+        limiter.backoff(0.2)
+        limiter.acquire()
+        start = time.monotonic()
+        for _ in range(4):
+            limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.06)
+
+    def test_throttled_search_retried(self):
+        """Test 429 responses are retried after Retry-After until results arrive"""
+        ThrottlingSearchHandler.throttled = 2
+        limiter = rate_limiter.RateLimiter(rate=100, burst=1)
+        with mock.patch.object(query_itunes, "ITUNES_SEARCH_URL", self.url):
+            results = query_itunes.fetch_search_results("Roxanne", limiter)
+        self.assertEqual(results, [{"trackName": "Roxanne"}])
+        self.assertEqual(ThrottlingSearchHandler.request_count, 3)
+
+    def test_throttled_retries_exhausted(self):
+        """Test a search still throttled after every retry raises"""
+        ThrottlingSearchHandler.throttled = 10
+        limiter = rate_limiter.RateLimiter(rate=100, burst=1)
+        with mock.patch.object(query_itunes, "ITUNES_SEARCH_URL", self.url):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                query_itunes.fetch_search_results("Roxanne", limiter, retries=1)
+        self.assertEqual(ThrottlingSearchHandler.request_count, 2)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@unittest.skipUnless(async_query.has_aiohttp(), "aiohttp not installed - the query engine is optional")
+class testQueryEngine(unittest.TestCase):
+    """Test utils/async_query.py"""
+
+    def setUp(self):
+        ThrottlingSearchHandler.throttled = 0
+        ThrottlingSearchHandler.request_count = 0
+        ThrottlingSearchHandler.results = [
+            {
+                "kind": "song",
+                "trackName": "Roxanne",
+                "collectionName": "Outlandos d'Amour",
+                "artistName": "The Police",
+                "primaryGenreName": "Rock",
+                "artworkUrl60": "https://is1-ssl.mzstatic.com/image/thumb/60x60bb.jpg",
+                "trackTimeMillis": 192000,
+            }
+        ]
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ThrottlingSearchHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.search_cache = itunes_cache.SearchCache(query_itunes.fetch_search_results, ":memory:")
+        self.patches = [
+            mock.patch.object(query_itunes, "ITUNES_SEARCH_URL", f"{url}/search"),
+            mock.patch.object(query_itunes, "OEMBED_URL", f"{url}/oembed"),
+            mock.patch.object(query_itunes, "itunes_rate_limiter", rate_limiter.RateLimiter(rate=1000, burst=10)),
+            mock.patch.object(itunes_cache, "_search_cache", self.search_cache),
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def test_query_itunes(self):
+        """Test rows are annotated in order, identical titles share a search
+        and a missing title is fetched with oEmbed"""
+        query_iter = enumerate(
+            (
+                ("The Police - Roxanne", {"id": "a"}),
+                ("the police - roxanne [HD]", {"id": "b"}),
+                (None, {"id": "c"}),
+            )
+        )
+        itunes_query = async_query.QueryEngine(concurrency=4).query_itunes(query_iter)
+        self.assertEqual([row_index for row_index, _ in itunes_query], [0, 1, 2])
+        for _, itunes_meta_json in itunes_query:
+            self.assertEqual(itunes_meta_json["track_name"], "Roxanne")
+            self.assertEqual(
+                itunes_meta_json["artwork_url_fullres"], "https://is1-ssl.mzstatic.com/image/thumb/600x600bb.jpg"
+            )
+        # one search shared by every row, one oEmbed request
+        self.assertEqual(ThrottlingSearchHandler.request_count, 2)
+        self.assertEqual(self.search_cache.misses, 1)
+
+    def test_throttled_and_no_results(self):
+        """Test throttled searches are retried and rows without results are None"""
+        ThrottlingSearchHandler.throttled = 1
+        ThrottlingSearchHandler.results = []
+        itunes_query = async_query.QueryEngine().query_itunes([(0, ("Unknown Artist - Unknown Song", {"id": "a"}))])
+        self.assertEqual(itunes_query, ((0, None),))
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        self.search_cache.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class testTrackStore(unittest.TestCase):
+    """Test columnar store of the playlist table"""
+
+    def setUp(self):
+        self.store = track_store.TrackStore()
+        self.store.extend(
+            [
+                {"title": "Sting - Roxanne", "id": "a", "duration": 195},
+                {"title": "The Police - Message in a Bottle", "id": "b", "duration": 290},
+                {"title": "Sting - Fields of Gold", "id": "c", "duration": 220},
+            ]
+        )
+
+    def test_extend_defaults(self):
+        """Test appended rows default to the video title and Unknown fields"""
+        self.assertEqual(len(self.store), 3)
+        self.assertEqual(self.store.get(1, 0), "The Police - Message in a Bottle")
+        self.assertEqual(
+            self.store.song_properties(0),
+            {
+                "song": "Sting - Roxanne",
+                "album": "Unknown",
+                "artist": "Unknown",
+                "genre": "Unknown",
+                "artwork": "Unknown",
+            },
+        )
+
+    def test_itunes_meta_and_reset(self):
+        """Test iTunes annotation of a row and reverting every row"""
+        itunes_meta_json = {
+            "track_name": "Roxanne",
+            "album_name": "Outlandos d'Amour",
+            "artist_name": "The Police",
+            "primary_genre_name": "Rock",
+            "artwork_url_fullres": "https://is1-ssl.mzstatic.com/image/thumb/600x600bb.jpg",
+            "match_score": 0.42,
+            "low_confidence": True,
+        }
+        self.store.set_itunes_meta(0, itunes_meta_json)
+        self.store.set_itunes_meta(1, None)
+        self.assertEqual(self.store.get(0, 2), "The Police")
+        self.assertTrue(self.store.low_confidence[0])
+        self.assertEqual(self.store.get(1, 0), "The Police - Message in a Bottle")
+
+        self.store.reset()
+        self.assertEqual(self.store.song, self.store.titles)
+        self.assertEqual(self.store.artist, ["Unknown"] * 3)
+        self.assertFalse(any(self.store.low_confidence))
+
+    def test_replace_all_and_remove(self):
+        """Test replacing every row but songs and removing rows"""
+        self.store.set(2, 1, "Ten Summoner's Tales")
+        self.store.set(1, 3, "")
+        self.store.replace_all(range(3), 2)
+        self.assertEqual(self.store.album, ["Ten Summoner's Tales"] * 3)
+        self.assertEqual(self.store.genre, ["Unknown", "", "Unknown"])
+        self.assertEqual(self.store.song[0], "Sting - Roxanne")
+
+        self.store.remove([2, 0])
+        self.assertEqual(self.store.titles, ["The Police - Message in a Bottle"])
+        self.assertEqual(len(self.store.low_confidence), 1)
+
+    def test_batch_edit_undo(self):
+        """Test a batch edit is restored in one step, skipping removed rows"""
+        undo_record = self.store.set_many([0, 1, 2], {1: "Synchronicity", 3: "Rock"})
+        self.assertEqual(self.store.album, ["Synchronicity"] * 3)
+        self.store.remove([1])
+        self.assertEqual(self.store.restore(undo_record), [0, 1])
+        self.assertEqual(self.store.album, ["Unknown"] * 2)
+        self.assertEqual(self.store.genre, ["Unknown"] * 2)
+
+    def test_video_id_rows(self):
+        """Test rows keep their video id handle while rows before them are removed"""
+        self.store.extend(
+            [{"title": "Sting - Roxanne", "id": video_id, "duration": 195} for video_id in ("d", "e", "f")]
+        )
+        self.store.remove([0, 2, 3])
+        self.assertEqual(self.store.ids, ["b", "e", "f"])
+        self.assertEqual([self.store.row(video_id) for video_id in "abcdef"], [None, 0, None, None, 1, 2])
+        self.assertNotIn("a", self.store)
+        self.assertEqual(self.store.titles[self.store.row("b")], "The Police - Message in a Bottle")
+
+
 if __name__ == "__main__":
     unittest.main(verbosity=2)
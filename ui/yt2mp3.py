@@ -117,7 +117,7 @@ class Ui_MainWindow(object):
         self.download_folder_select.setFrameShape(QtWidgets.QFrame.StyledPanel)
         self.download_folder_select.setFrameShadow(QtWidgets.QFrame.Plain)
         self.download_folder_select.setObjectName("download_folder_select")
-        self.video_table = QtWidgets.QTableWidget(self.centralwidget)
+        self.video_table = QtWidgets.QTableView(self.centralwidget)
         self.video_table.setGeometry(QtCore.QRect(40, 70, 871, 284))
         font = QtGui.QFont()
         font.setFamily("Arial")
@@ -126,39 +126,7 @@ class Ui_MainWindow(object):
         self.video_table.setFocusPolicy(QtCore.Qt.StrongFocus)
         self.video_table.setStyleSheet("color: rgb(240, 240, 240)")
         self.video_table.setMidLineWidth(0)
-        self.video_table.setRowCount(250)
-        self.video_table.setColumnCount(5)
         self.video_table.setObjectName("video_table")
-        item = QtWidgets.QTableWidgetItem()
-        font = QtGui.QFont()
-        font.setFamily("Arial")
-        font.setPointSize(13)
-        item.setFont(font)
-        self.video_table.setHorizontalHeaderItem(0, item)
-        item = QtWidgets.QTableWidgetItem()
-        font = QtGui.QFont()
-        font.setFamily("Arial")
-        font.setPointSize(13)
-        item.setFont(font)
-        self.video_table.setHorizontalHeaderItem(1, item)
-        item = QtWidgets.QTableWidgetItem()
-        font = QtGui.QFont()
-        font.setFamily("Arial")
-        font.setPointSize(13)
-        item.setFont(font)
-        self.video_table.setHorizontalHeaderItem(2, item)
-        item = QtWidgets.QTableWidgetItem()
-        font = QtGui.QFont()
-        font.setFamily("Arial")
-        font.setPointSize(13)
-        item.setFont(font)
-        self.video_table.setHorizontalHeaderItem(3, item)
-        item = QtWidgets.QTableWidgetItem()
-        font = QtGui.QFont()
-        font.setFamily("Arial")
-        font.setPointSize(13)
-        item.setFont(font)
-        self.video_table.setHorizontalHeaderItem(4, item)
         self.video_table.horizontalHeader().setVisible(True)
         self.video_table.horizontalHeader().setCascadingSectionResizes(False)
         self.video_table.horizontalHeader().setDefaultSectionSize(164)
@@ -316,16 +284,6 @@ class Ui_MainWindow(object):
         self.download_path.setText(_translate("MainWindow", "Select"))
         self.download_folder_select.setText(_translate("MainWindow", "Folder: "))
         self.video_table.setSortingEnabled(False)
-        item = self.video_table.horizontalHeaderItem(0)
-        item.setText(_translate("MainWindow", "song"))
-        item = self.video_table.horizontalHeaderItem(1)
-        item.setText(_translate("MainWindow", "album"))
-        item = self.video_table.horizontalHeaderItem(2)
-        item.setText(_translate("MainWindow", "artist"))
-        item = self.video_table.horizontalHeaderItem(3)
-        item.setText(_translate("MainWindow", "genre"))
-        item = self.video_table.horizontalHeaderItem(4)
-        item.setText(_translate("MainWindow", "artwork"))
         self.cancel_button.setText(_translate("MainWindow", "Cancel"))
         self.download_folder_label.setText(_translate("MainWindow", "Download folder"))
         self.itunes_annotate.setText(_translate("MainWindow", "Ask butler"))
@@ -1,6 +1,32 @@
-"""Allow access to four methods from utils"""
+"""Allow access to methods from utils. Submodules - and their heavy
+dependencies (pytubefix, youtube_dl, mutagen, itunespy, requests) - are
+imported when first used, keeping startup of the GUI and CLI fast."""
 
-from utils._threading import map_threads
-from utils.query_itunes import thread_query_itunes
-from utils.query_youtube import get_youtube_content
-from utils.download_youtube import thread_query_youtube
+import importlib
+
+_LAZY_ATTRIBUTES = {
+    "map_threads": "utils._threading",
+    "get_artwork": "utils.artwork_cache",
+    "thread_query_itunes": "utils.query_itunes",
+    "query_itunes_rows": "utils.async_query",
+    "get_youtube_content": "utils.query_youtube",
+    "iter_youtube_content": "utils.query_youtube",
+    "download_tracks": "utils.download_youtube",
+    "thread_query_youtube": "utils.download_youtube",
+    "TrackStore": "utils.track_store",
+    "CancelToken": "utils.cancellation",
+}
+
+
+def __getattr__(name):
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value  # skip __getattr__ on next access
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
@@ -1,4 +1,11 @@
 import concurrent.futures
+import multiprocessing
+import queue
+import threading
+
+# Items waiting between two pipeline stages - bounds memory and applies backpressure.
+STAGE_QUEUE_SIZE = 4
+_STAGE_DONE = object()
 
 
 def map_threads(func, _iterable):
@@ -13,3 +20,74 @@ def map_processes(func, _iterable):
     with concurrent.futures.ProcessPoolExecutor() as executor:
         result = executor.map(func, _iterable)
     return result
+
+
+def map_stages(stages, _iterable, queue_size=STAGE_QUEUE_SIZE, report=None, cancel_token=None):
+    """Pass every item of iterable through a pipeline of stages connected by
+    bounded queues, so later stages work on item N while earlier stages work
+    on item N + 1. `stages` is a sequence of (func, workers, use_processes)
+    tuples - process stages run func on a process pool of `workers` size.
+    If given, report(index, stage_index, error) is called as an item enters
+    a stage, fails (with the exception) or leaves the last stage (with
+    stage_index == len(stages)). If given, cancel_token.wait() is called
+    before an item enters any but the last stage - pausing holds items back
+    while the ones inside stages finish, and cancelling fails them with
+    Cancelled. Return results in input order: the last stage's return value,
+    or the exception that stopped the item."""
+    report = report or (lambda index, stage_index, error=None: None)
+    items = list(_iterable)
+    results = [None] * len(items)
+    queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+    executors = []
+    stage_threads = []
+
+    def work(stage_index, func, executor, inbox, outbox):
+        while True:
+            entry = inbox.get()
+            if entry is _STAGE_DONE:
+                return
+            index, item = entry
+            try:
+                if cancel_token is not None and stage_index < len(stages) - 1:
+                    cancel_token.wait()
+                report(index, stage_index)
+                item = executor.submit(func, item).result() if executor else func(item)
+            except Exception as error:
+                results[index] = error
+                report(index, stage_index, error)
+                continue
+            if outbox is None:
+                results[index] = item
+                report(index, len(stages))
+            else:
+                outbox.put((index, item))
+
+    for stage_index, (func, workers, use_processes) in enumerate(stages):
+        executor = None
+        if use_processes:
+            # spawn - forking a process running Qt or worker threads is unsafe
+            executor = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            executors.append(executor)
+        outbox = queues[stage_index + 1] if stage_index + 1 < len(stages) else None
+        threads = [
+            threading.Thread(target=work, args=(stage_index, func, executor, queues[stage_index], outbox), daemon=True)
+            for _ in range(workers)
+        ]
+        for thread in threads:
+            thread.start()
+        stage_threads.append(threads)
+
+    try:
+        for entry in enumerate(items):
+            queues[0].put(entry)
+        # close stages in order - a stage is done once every upstream item passed through it
+        for inbox, threads in zip(queues, stage_threads):
+            for _ in threads:
+                inbox.put(_STAGE_DONE)
+            for thread in threads:
+                thread.join()
+    finally:
+        for executor in executors:
+            executor.shutdown()
+
+    return results
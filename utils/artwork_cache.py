@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from utils import http_client
+
+# Byte budget of the in-memory tier - roughly 80 600x600 JPEG covers.
+MEMORY_CACHE_BYTES = 8 * 1024 * 1024
+# Directory of the on-disk tier - None keeps artwork in memory only.
+DISK_CACHE_DIR = None
+DISK_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def fetch_artwork(artwork_url):
+    """Get artwork byte content from url - empty bytes if unavailable."""
+    import requests
+
+    try:
+        response = http_client.get(artwork_url)
+    except requests.exceptions.RequestException:
+        return bytes()
+
+    if response.status_code != 200:
+        return bytes()
+    return response.content
+
+
+class _Flight:
+    """A fetch in progress, shared by every thread requesting the same url."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.content = bytes()
+
+
+class ArtworkCache:
+    """Thread-safe artwork content cache keyed by artwork url. Holds an
+    in-memory LRU tier bounded by `max_memory_bytes` and, if `disk_dir` is
+    given, an on-disk tier evicting least recently used files beyond
+    `max_disk_bytes`. Concurrent requests for one url share a single fetch."""
+
+    def __init__(
+        self,
+        max_memory_bytes=MEMORY_CACHE_BYTES,
+        disk_dir=DISK_CACHE_DIR,
+        max_disk_bytes=DISK_CACHE_BYTES,
+        fetch=fetch_artwork,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.fetch = fetch
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def get(self, artwork_url):
+        """Get artwork bytes for url - empty bytes if url is not a url or
+        artwork could not be fetched. Failed fetches are not cached."""
+        if not isinstance(artwork_url, str) or not artwork_url.startswith(("http://", "https://")):
+            return bytes()
+
+        with self._lock:
+            content = self._memory_get(artwork_url)
+            if content is not None:
+                return content
+            flight = self._in_flight.get(artwork_url)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._in_flight[artwork_url] = _Flight()
+
+        if not is_leader:
+            flight.done.wait()
+            return flight.content
+
+        try:
+            content = self._disk_get(artwork_url)
+            if content is None:
+                content = self.fetch(artwork_url)
+                if content:
+                    self._disk_put(artwork_url, content)
+            flight.content = content
+        finally:
+            with self._lock:
+                if flight.content:
+                    self._memory_put(artwork_url, flight.content)
+                del self._in_flight[artwork_url]
+            flight.done.set()
+
+        return flight.content
+
+    def clear(self):
+        """Empty the in-memory tier."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+
+    def _memory_get(self, artwork_url):
+        """Get content from the memory tier and mark it most recently used."""
+        content = self._memory.get(artwork_url)
+        if content is not None:
+            self._memory.move_to_end(artwork_url)
+        return content
+
+    def _memory_put(self, artwork_url, content):
+        """Add content to the memory tier, evicting least recently used entries."""
+        if len(content) > self.max_memory_bytes or artwork_url in self._memory:
+            return
+        self._memory[artwork_url] = content
+        self._memory_bytes += len(content)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _disk_path(self, artwork_url):
+        return os.path.join(self.disk_dir, hashlib.sha1(artwork_url.encode()).hexdigest())
+
+    def _disk_get(self, artwork_url):
+        """Get content from the disk tier - None if absent or disabled."""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(artwork_url)
+        try:
+            with open(path, "rb") as artwork_file:
+                content = artwork_file.read()
+            os.utime(path)  # mark as recently used for eviction
+        except OSError:
+            return None
+        return content
+
+    def _disk_put(self, artwork_url, content):
+        """Write content to the disk tier, evicting least recently used files."""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(artwork_url)
+        try:
+            with open(f"{path}.tmp", "wb") as artwork_file:
+                artwork_file.write(content)
+            os.replace(f"{path}.tmp", path)
+            self._evict_disk()
+        except OSError as error:
+            print(f"Error: {str(error)}")  # poor man's logging
+
+    def _evict_disk(self):
+        """Remove least recently used files until the disk tier fits its budget."""
+        entries = sorted(
+            (entry.stat().st_mtime, entry.stat().st_size, entry.path)
+            for entry in os.scandir(self.disk_dir)
+            if entry.is_file() and not entry.name.endswith(".tmp")
+        )
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total_bytes <= self.max_disk_bytes:
+                break
+            os.remove(path)
+            total_bytes -= size
+
+
+# Process-wide cache shared by iTunes annotation, file tagging and the GUI preview.
+artwork_cache = ArtworkCache()
+
+
+def get_artwork(artwork_url):
+    """Get artwork bytes for url from the process-wide cache."""
+    return artwork_cache.get(artwork_url)
@@ -0,0 +1,143 @@
+import asyncio
+import importlib.util
+import threading
+
+from utils import http_client, query_itunes
+from utils._threading import map_threads
+from utils.itunes_cache import get_search_cache
+from utils.match_score import best_match
+from utils.normalize_title import get_search_term
+
+# Requests in flight at once on the event loop.
+QUERY_CONCURRENCY = 32
+
+
+def has_aiohttp():
+    """aiohttp is an optional dependency - without it, queries run on a thread pool."""
+    return importlib.util.find_spec("aiohttp") is not None
+
+
+class QueryEngine:
+    """Event loop on one daemon thread, started on first use, querying YouTube
+    oEmbed and the iTunes Search API. Sync wrappers let threads (e.g. the
+    QThreads of main.py) run whole batches on it. Every batch shares one
+    aiohttp session whose requests are bounded by a `concurrency` semaphore."""
+
+    def __init__(self, concurrency=QUERY_CONCURRENCY):
+        self.concurrency = concurrency
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def run(self, coroutine):
+        """Run coroutine on the engine loop and block until its result."""
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="QueryEngine", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def query_itunes(self, query_iter):
+        """Sync version of thread_query_itunes over every (row_index,
+        (title, video)) item of query_iter. Return a tuple of (row_index,
+        ITUNES_META_JSON) in input order."""
+        return self.run(self._query_itunes(tuple(query_iter)))
+
+    async def _query_itunes(self, query_args):
+        async with self._session() as session:
+            semaphore = asyncio.Semaphore(self.concurrency)
+            return tuple(await asyncio.gather(*(query_itunes_row(session, semaphore, args) for args in query_args)))
+
+    def _session(self):
+        import aiohttp
+
+        connect_timeout, read_timeout = http_client.TIMEOUT
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.concurrency),
+            timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+        )
+
+
+async def query_itunes_row(session, semaphore, args):
+    """Coroutine version of query_itunes.thread_query_itunes."""
+    row_index, (vid_title, video) = args
+    if not vid_title:
+        vid_title = await oembed_title(session, semaphore, f"https://www.youtube.com/watch?v={video['id']}")
+        if not vid_title:
+            return (row_index, None)
+
+    search_term = get_search_term(vid_title)
+    results = await search_results(session, semaphore, search_term)
+    if not results and search_term != vid_title:
+        results = await search_results(session, semaphore, vid_title)  # e.g. titles in "Track - Artist" order
+    if not results:
+        return (row_index, None)
+
+    from itunespy.track import Track
+
+    try:
+        tracks = query_itunes.set_track_minutes([Track(item) for item in results])
+    except (AttributeError, KeyError):  # i.e. malformed results, as query_itunes
+        return (row_index, None)
+    match_score, track = best_match(vid_title, video.get("duration"), tracks)
+    return (row_index, query_itunes.get_itunes_meta_json(track, match_score))
+
+
+async def oembed_title(session, semaphore, vid_url):
+    """Coroutine version of query_itunes.oembed_title."""
+    import aiohttp
+
+    try:
+        async with semaphore, session.get(
+            query_itunes.OEMBED_URL, params={"url": vid_url, "format": "json"}
+        ) as response:
+            vid_json = await response.json(content_type=None)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+        return None
+    return vid_json["title"] if isinstance(vid_json, dict) else None
+
+
+async def search_results(session, semaphore, term):
+    """Get the raw iTunes result list of term through the search cache -
+    None if the search failed."""
+    import aiohttp
+
+    async def search(term):
+        return await fetch_search_results(session, semaphore, term)
+
+    try:
+        return await get_search_cache(query_itunes.fetch_search_results).get_async(term, search)
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError):
+        return None
+
+
+async def fetch_search_results(session, semaphore, term, retries=query_itunes.ITUNES_RETRIES):
+    """Coroutine version of query_itunes.fetch_search_results sharing its
+    rate limiter with the thread pool path."""
+    rate_limiter = query_itunes.itunes_rate_limiter
+    for attempt in range(retries + 1):
+        await rate_limiter.acquire_async()
+        async with semaphore, session.get(
+            query_itunes.ITUNES_SEARCH_URL, params=query_itunes.get_search_params(term)
+        ) as response:
+            if response.status not in query_itunes.THROTTLED_STATUSES or attempt == retries:
+                response.raise_for_status()
+                results = (await response.json(content_type=None))["results"]
+                break
+        retry_after = query_itunes.get_retry_after(response)
+        rate_limiter.backoff(query_itunes.ITUNES_BACKOFF * 2**attempt if retry_after is None else retry_after)
+
+    rate_limiter.success()
+    return results
+
+
+# Process-wide engine shared by the GUI and the command line.
+query_engine = QueryEngine()
+
+
+def query_itunes_rows(query_iter):
+    """Get (row_index, ITUNES_META_JSON) of every (row_index, (title,
+    video)) item of query_iter - on the asyncio engine if aiohttp is
+    installed, else on a thread pool."""
+    if has_aiohttp():
+        return query_engine.query_itunes(query_iter)
+    return tuple(map_threads(query_itunes.thread_query_itunes, query_iter))
@@ -0,0 +1,45 @@
+import threading
+
+
+class Cancelled(Exception):
+    """The work was stopped through its CancelToken."""
+
+
+class CancelToken:
+    """Cancellation and pause flag shared by every thread working on one
+    download. Workers call check() between chunks of work, and wait() before
+    starting new work - it blocks while paused. Safe to share between threads."""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._running = threading.Event()
+        self._running.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    @property
+    def paused(self):
+        return not self._running.is_set()
+
+    def cancel(self):
+        """Stop every worker at its next check - paused workers included."""
+        self._cancelled.set()
+        self._running.set()
+
+    def pause(self):
+        self._running.clear()
+
+    def resume(self):
+        self._running.set()
+
+    def check(self):
+        """Raise Cancelled once cancelled."""
+        if self._cancelled.is_set():
+            raise Cancelled()
+
+    def wait(self):
+        """Block while paused, then raise Cancelled once cancelled."""
+        self._running.wait()
+        self.check()
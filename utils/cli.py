@@ -0,0 +1,152 @@
+"""Headless batch downloads: python -m utils URL [URL ...] [options]
+
+Runs the load -> annotate -> download pipeline of the GUI without importing
+PyQt5 and writes a JSON results report."""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+
+from utils.async_query import query_itunes_rows
+from utils.download_youtube import DOWNLOAD_WORKERS, TRANSCODE_WORKERS, download_tracks
+from utils.query_youtube import get_youtube_content
+
+
+def main(argv=None):
+    """Parse command line arguments, download every video and write the
+    results report. Return exit status - 1 if any URL or track failed."""
+    args = parse_args(argv)
+    urls = list(args.urls)
+    if args.file:
+        urls += read_url_file(args.file)
+    if not urls:
+        print("No URL to download.", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    time0 = time.time()
+    report = {"urls": [], "tracks": []}
+    for url in urls:
+        url_report, track_reports = download_url(url, args)
+        report["urls"].append(url_report)
+        report["tracks"] += track_reports
+    report["elapsed"] = round(time.time() - time0, 2)
+
+    report_json = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as report_file:
+            report_file.write(report_json)
+    else:
+        print(report_json)
+
+    failed = any(entry["error"] for entry in report["urls"]) or any(
+        track["status"] != "ok" for track in report["tracks"]
+    )
+    return int(failed)
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog="python -m utils", description="Download YouTube videos as tagged audio.")
+    parser.add_argument("urls", nargs="*", help="YouTube playlist or video URLs")
+    parser.add_argument("-f", "--file", help="file of URLs, one per line (# starts a comment)")
+    parser.add_argument("-o", "--output", default=os.getcwd(), help="download folder (default: current folder)")
+    parser.add_argument("--mp4", action="store_true", help="save M4A files instead of MP3")
+    parser.add_argument("--annotate", action="store_true", help="annotate tracks with iTunes metadata")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="concurrent downloads")
+    parser.add_argument("--transcode-workers", type=int, default=TRANSCODE_WORKERS, help="concurrent transcodes")
+    parser.add_argument("--ignore-errors", action="store_true", help="skip unavailable videos of a playlist")
+    parser.add_argument("--no-cache", action="store_true", help="fetch video metadata again instead of the cache")
+    parser.add_argument("--report", help="write the JSON results report to this file (default: stdout)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="no progress output on stderr")
+    return parser.parse_args(argv)
+
+
+def read_url_file(file_path):
+    """Get URLs of a file, one per line - skip blank lines and comments."""
+    with open(file_path) as url_file:
+        lines = (line.split("#")[0].strip() for line in url_file)
+        return [line for line in lines if line]
+
+
+def download_url(url, args):
+    """Load, optionally annotate and download every video of url. Return the
+    url report and one report per track."""
+    try:
+        videos_dict = get_youtube_content(url, args.ignore_errors, use_cache=not args.no_cache)
+    except RuntimeError as error:
+        return {"url": url, "error": str(error) or "Could not get URL."}, []
+    if not videos_dict:
+        return {"url": url, "error": "Could not get URL."}, []
+
+    video_items = [(video["title"], video) for video in videos_dict.values()]
+    itunes_meta = dict.fromkeys(range(len(video_items)))
+    if args.annotate:
+        itunes_meta.update(query_itunes_rows(enumerate(video_items)))
+    playlist_properties = [
+        get_song_properties(title, itunes_meta[row_index]) for row_index, (title, _) in enumerate(video_items)
+    ]
+
+    mp4_path = os.path.join(args.output, "mp4")
+    os.makedirs(mp4_path, exist_ok=True)
+    video_properties = (
+        (key_value, (args.output, mp4_path), playlist_properties[index], args.mp4)
+        for index, key_value in enumerate(video_items)
+    )
+    results = download_tracks(
+        video_properties,
+        download_workers=args.workers,
+        transcode_workers=args.transcode_workers,
+        progress=None if args.quiet else print_progress,
+    )
+    if not any(isinstance(result, Exception) for result in results):
+        shutil.rmtree(mp4_path)  # remove mp4 dir - else keep partial downloads to resume
+
+    track_reports = []
+    for row_index, ((title, video), song_properties, result) in enumerate(
+        zip(video_items, playlist_properties, results)
+    ):
+        failed = isinstance(result, Exception)
+        track_reports.append(
+            {
+                "url": url,
+                "title": title,
+                "id": video["id"],
+                **song_properties,
+                "match_score": (itunes_meta[row_index] or {}).get("match_score"),
+                "status": "failed" if failed else "ok",
+                "path": None if failed else result,
+                "error": str(result.__cause__ or result) if failed else None,
+            }
+        )
+    return {"url": url, "error": None}, track_reports
+
+
+def get_song_properties(title, itunes_meta_json=None):
+    """Get song properties of a video - iTunes annotation if available,
+    else the video title as song name (as the GUI table defaults to)."""
+    if not itunes_meta_json:
+        song_properties = dict.fromkeys(("album", "artist", "genre", "artwork"), "Unknown")
+        song_properties["song"] = title
+    else:
+        song_properties = {
+            "song": itunes_meta_json["track_name"],
+            "album": itunes_meta_json["album_name"],
+            "artist": itunes_meta_json["artist_name"],
+            "genre": itunes_meta_json["primary_genre_name"],
+            "artwork": itunes_meta_json["artwork_url_fullres"],
+        }
+    song_properties["song"] = song_properties["song"].replace("/", "-")  # will be filename
+    return song_properties
+
+
+def print_progress(summary):
+    """Print download progress summary on stderr."""
+    status = f'Downloaded {summary["completed"]}/{summary["total"]}'
+    if summary["throughput"]:
+        status += f' - {summary["throughput"] / 1e6:.1f} MB/s'
+    if summary["failed"]:
+        status += f' - {summary["failed"]} failed'
+    print(status, file=sys.stderr)
@@ -1,17 +1,83 @@
+import functools
 import os
-from shutil import copy2
 
-from pytubefix import YouTube
-import requests
-from mutagen.mp3 import MP3
-from mutagen.mp4 import MP4, MP4Cover
-from mutagen.id3 import ID3, APIC, TALB, TPE1, TIT2, TCON
-from moviepy.editor import VideoFileClip
-
-
-def thread_query_youtube(args):
+from utils import http_client
+from utils._threading import map_stages
+from utils.artwork_cache import get_artwork
+from utils.cancellation import Cancelled
+from utils.extract_audio import extract_audio
+from utils.progress import DownloadProgress
+from utils.transfer import MAX_SEGMENTS, download_resumable, get_segment_count
+
+# Download only the audio track when YouTube serves one as an adaptive stream.
+AUDIO_ONLY = True
+# Bitrate (kbps) to aim for - the highest audio-only stream at or below it is chosen.
+TARGET_ABR = 160
+# Codecs ranked ahead of bitrate. AAC ("mp4a") can be remuxed into M4A without re-encoding.
+M4A_PREFERRED_CODECS = ("mp4a",)
+MP3_PREFERRED_CODECS = ()
+# Pipeline sizing - network fetches are I/O bound, transcoding is CPU bound.
+DOWNLOAD_WORKERS = 4
+TRANSCODE_WORKERS = os.cpu_count() or 1
+# Fetch large streams over several concurrent connections - YouTube throttles per connection.
+SEGMENTED_DOWNLOAD = True
+
+
+def thread_query_youtube(args, on_progress=None, cancel_token=None):
     """Download video to mp4 then mp3 -- triggered
-    by map_threads"""
+    by map_threads. If given, cancel_token stops the download between
+    chunks, FFmpeg while it runs, and the track between steps."""
+    job = download_track(args, on_progress, cancel_token)
+    if cancel_token is not None:
+        cancel_token.check()
+    job = transcode_track(job, cancel_token)
+    if cancel_token is not None:
+        cancel_token.check()
+    return tag_track(job)
+
+
+def download_tracks(
+    video_properties,
+    download_workers=DOWNLOAD_WORKERS,
+    transcode_workers=TRANSCODE_WORKERS,
+    progress=None,
+    cancel_token=None,
+):
+    """Download, transcode and tag every track of `video_properties` (the
+    thread_query_youtube args) through a staged pipeline: network fetches on
+    a thread pool, transcoding on a process pool and tagging on one thread.
+    If given, progress(summary) receives throttled DownloadProgress summaries.
+    A paused cancel_token holds tracks back from their next stage - a
+    cancelled one stops downloads between chunks and fails the tracks not
+    yet transcoded with Cancelled. Transcodes already running on the process
+    pool finish and are tagged. Tracks sharing a song name are written to
+    numbered files. Return per-track results in input order - the tagged
+    file path, or the exception that stopped the track."""
+    video_properties = list(video_properties)
+    filenames = get_unique_filenames(args[2]["song"] for args in video_properties)
+    tracker = DownloadProgress(len(video_properties), progress)
+    # size the shared connection pool for every segment of every concurrent download
+    http_client.get_session(max(http_client.POOL_SIZE, download_workers * MAX_SEGMENTS))
+
+    def download_stage(entry):
+        index, args = entry
+        return download_track(args, functools.partial(tracker.received, index), cancel_token, filenames[index])
+
+    stages = (
+        (download_stage, download_workers, False),
+        (transcode_track, transcode_workers, True),
+        (tag_track, 1, False),
+    )
+    return map_stages(stages, enumerate(video_properties), report=tracker.stage, cancel_token=cancel_token)
+
+
+def download_track(args, on_progress=None, cancel_token=None, filename=None):
+    """Download the selected YouTube stream to the temporary folder, calling
+    on_progress(bytes_received, bytes_total) as data arrives. Raise Cancelled
+    between chunks once cancel_token is cancelled. Return the track job
+    handed to transcode_track - writing the audio file `filename` (the song
+    name if None) plus extension."""
+    from pytubefix import YouTube
 
     yt_link_starter = "https://www.youtube.com/watch?v="
     _, videos_dict = args[0]
@@ -20,100 +86,135 @@ def thread_query_youtube(args):
     save_as_mp4 = args[3]
     full_link = yt_link_starter + videos_dict["id"]
 
-    def new_get_youtube_mp3():
-        try:
-            yt = YouTube(full_link)
-            print(yt.title)
-
-            ys = yt.streams.get_audio_only()
-            ys.download(mp3=True)
-        except Exception as error:  # not a good Exceptions catch...
-            print(f"Error: {str(error)}")  # poor man's logging
-            raise RuntimeError from error
-
-    def get_youtube_mp4():
-        """Write MP4 audio file from YouTube video."""
-        try:
-            video = YouTube(full_link)
-            stream = video.streams.get_highest_resolution()
-            mp4_filename = f'{song_properties.get("song")}'
-            illegal_char = (
-                "?",
-                "'",
-                '"',
-                ".",
-                "/",
-                "\\",
-                "*",
-                "^",
-                "%",
-                "$",
-                "#",
-                "~",
-                "<",
-                ">",
-                ",",
-                ";",
-                ":",
-                "|",
-            )
-            # remove illegal characters from song title - otherwise clipped by pytube
-            for char in illegal_char:
-                mp4_filename = mp4_filename.replace(char, "")
-
-            mp4_filename += ".mp4"  # add extension for downstream file recognition
-            stream.download(mp4_path, filename=f"{mp4_filename}")
-            if save_as_mp4:
-                m4a_filename = f'{song_properties.get("song")}.m4a'
-                # Copy song from temporary folder to destination
-                copy2(
-                    os.path.join(mp4_path, mp4_filename),
-                    os.path.join(download_path, m4a_filename),
-                )
-                return set_song_metadata(download_path, song_properties, m4a_filename, True)
-
-            return get_youtube_mp3(mp4_filename)
-        except Exception as error:  # not a good Exceptions catch...
-            print(f"Error: {str(error)}")  # poor man's logging
-            raise RuntimeError from error
-
-    def get_youtube_mp3(mp4_filename):
-        """Write MP3 audio file from MP4."""
-        mp3_filename = f'{song_properties.get("song")}.mp3'
-        try:
-            video = VideoFileClip(os.path.join(mp4_path, mp4_filename))
-            video.audio.write_audiofile(os.path.join(download_path, mp3_filename))
-            set_song_metadata(download_path, song_properties, mp3_filename, False)
-        except Exception as e:
-            print(e)
-        finally:
-            video.close()
-
-    return get_youtube_mp4()
+    try:
+        video = YouTube(full_link)
+        preferred_codecs = M4A_PREFERRED_CODECS if save_as_mp4 else MP3_PREFERRED_CODECS
+        stream = select_stream(video.streams, preferred_codecs=preferred_codecs)
+        # named after the stream - videos sharing a title must not share partial data
+        mp4_filename = f'{videos_dict["id"]}-{stream.itag}.{stream.subtype}'  # extension for file recognition
+        # resumable - partial data and its journal stay in mp4_path if the download fails
+        download_resumable(
+            stream.url,
+            os.path.join(mp4_path, mp4_filename),
+            stream.filesize,
+            {"video_id": videos_dict["id"], "itag": stream.itag},
+            segments=get_segment_count(stream.filesize) if SEGMENTED_DOWNLOAD else 1,
+            on_progress=on_progress,
+            cancel_token=cancel_token,
+        )
+    except Cancelled:
+        raise
+    except Exception as error:  # not a good Exceptions catch...
+        print(f"Error: {str(error)}")  # poor man's logging
+        raise RuntimeError from error
+
+    extension = "m4a" if save_as_mp4 else "mp3"
+    return {
+        "source_path": os.path.join(mp4_path, mp4_filename),
+        "download_path": download_path,
+        "song_filename": f'{filename or song_properties.get("song")}.{extension}',
+        "song_properties": song_properties,
+        "save_as_mp4": save_as_mp4,
+    }
+
+
+def transcode_track(job, cancel_token=None):
+    """Write M4A (remux, no re-encoding) or MP3 audio file from the
+    downloaded stream. Safe to run in a worker process - without a
+    cancel_token, which cannot be shared with other processes."""
+    try:
+        extract_audio(
+            job["source_path"], os.path.join(job["download_path"], job["song_filename"]), cancel_token=cancel_token
+        )
+    except Cancelled:
+        raise
+    except Exception as error:
+        print(f"Error: {str(error)}")  # poor man's logging
+        raise RuntimeError from error
+
+    return job
+
+
+def tag_track(job):
+    """Write song metadata to the audio file. Return its path."""
+    set_song_metadata(job["download_path"], job["song_properties"], job["song_filename"], job["save_as_mp4"])
+    return os.path.join(job["download_path"], job["song_filename"])
+
+
+def get_unique_filenames(song_names):
+    """Get a filename per song name - repeated names (ignoring case) are
+    numbered, e.g. "Roxanne", "Roxanne (2)"."""
+    filenames = []
+    taken = set()
+    for song_name in song_names:
+        filename, number = song_name, 1
+        while filename.casefold() in taken:
+            number += 1
+            filename = f"{song_name} ({number})"
+        taken.add(filename.casefold())
+        filenames.append(filename)
+    return filenames
+
+
+def select_stream(streams, audio_only=AUDIO_ONLY, target_abr=TARGET_ABR, preferred_codecs=()):
+    """Select the stream to download from a pytube StreamQuery. Picks the best
+    audio-only adaptive stream - preferred codecs first, then the bitrate closest
+    to `target_abr` from below - and falls back to the highest resolution
+    progressive stream if no audio-only stream exists."""
+    audio_streams = list(streams.filter(only_audio=True)) if audio_only else []
+    if not audio_streams:
+        return streams.get_highest_resolution()
+
+    def stream_rank(stream):
+        codec = stream.audio_codec or ""
+        codec_rank = next(
+            (-index for index, prefix in enumerate(preferred_codecs) if codec.startswith(prefix)),
+            -len(preferred_codecs),
+        )
+        abr = abr_to_kbps(stream.abr)
+        # streams at or below target rank above all streams exceeding it
+        return (codec_rank, abr <= target_abr, abr if abr <= target_abr else -abr)
+
+    return max(audio_streams, key=stream_rank)
+
+
+def abr_to_kbps(abr):
+    """Convert a pytube average bitrate string (e.g. "128kbps") to int."""
+    try:
+        return int(abr.replace("kbps", ""))
+    except (AttributeError, ValueError):
+        return 0
 
 
 def set_song_metadata(directory, song_properties, song_filename, save_as_mp4):
     """Set song metadata."""
+    from mutagen.mp3 import MP3
+    from mutagen.mp4 import MP4, MP4Cover
+    from mutagen.id3 import ID3, APIC, TALB, TPE1, TIT2, TCON
 
     def write_to_mp4():
         """Add metadata to MP4 file."""
         # NOTE Metadata for MP4 will fail to write if any error (esp. with artwork) occurs
         audio = MP4(os.path.join(directory, song_filename))
+        if audio.tags is None:
+            audio.add_tags()
         audio.tags["\xa9alb"] = song_properties["album"]
         audio.tags["\xa9ART"] = song_properties["artist"]
         audio.tags["\xa9nam"] = song_properties["song"]
         audio.tags["\xa9gen"] = song_properties["genre"]
-        # Only add a cover if the response was ok and the header of the
-        # response content is that of a JPEG image. Source:
+        # Only add a cover if artwork was fetched and its header is
+        # that of a JPEG image. Source:
         # https://www.file-recovery.com/jpg-signature-format.htm.
         if valid_artwork():
-            audio.tags["covr"] = [MP4Cover(response.content, imageformat=MP4Cover.FORMAT_JPEG)]
+            audio.tags["covr"] = [MP4Cover(artwork, imageformat=MP4Cover.FORMAT_JPEG)]
 
         audio.save()
 
     def write_to_mp3():
         """Add metadata to MP3 file."""
         audio = MP3(os.path.join(directory, song_filename), ID3=ID3)
+        if audio.tags is None:
+            audio.add_tags()
         audio["TALB"] = TALB(encoding=3, text=song_properties["album"])
         audio["TPE1"] = TPE1(encoding=3, text=song_properties["artist"])
         audio["TIT2"] = TIT2(encoding=3, text=song_properties["song"])
@@ -125,24 +226,18 @@ def set_song_metadata(directory, song_properties, song_filename, save_as_mp4):
                     mime="image/jpeg",  # image/jpeg or image/png
                     type=3,  # 3 is for the cover image
                     desc="Cover",
-                    data=response.content,
+                    data=artwork,
                 )
             )
 
         audio.save()
 
     def valid_artwork():
-        """Validate artwork requests response."""
-        return response is not None and response.status_code == 200 and response.content[:3] == b"\xff\xd8\xff"
+        """Validate artwork byte content."""
+        return artwork[:3] == b"\xff\xd8\xff"
 
-    # TODO Cache the image until program finishes
-    try:
-        # Get byte data for album artwork url. The first number in the timeout
-        # tuple is for the initial connection to the server. The second number
-        # is for the subsequent response from the server.
-        response = requests.get(song_properties["artwork"], timeout=(1, 5))
-    except requests.exceptions.MissingSchema:
-        response = None
+    # Get byte data for album artwork url - shared with every track of the album
+    artwork = get_artwork(song_properties["artwork"])
 
     if save_as_mp4:
         write_to_mp4()
@@ -0,0 +1,79 @@
+import contextlib
+import os
+import subprocess
+
+from utils.cancellation import Cancelled
+
+# MP3 encoding bitrate handed to FFmpeg's LAME encoder.
+MP3_BITRATE = "192k"
+# Seconds between two cancellation checks of a running FFmpeg process.
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def get_ffmpeg_exe():
+    """Get path to the FFmpeg binary shipped with imageio-ffmpeg (installed
+    alongside moviepy) - else fall back to FFmpeg on PATH."""
+    try:
+        from imageio_ffmpeg import get_ffmpeg_exe as _get_ffmpeg_exe
+
+        return _get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        return "ffmpeg"
+
+
+def extract_audio(source_path, destination_path, bitrate=MP3_BITRATE, cancel_token=None):
+    """Write the audio track of a downloaded video to an audio file.
+    M4A destinations are remuxed (AAC is copied as-is, no decoding) and only
+    MP3 destinations are transcoded, by a single FFmpeg encoder process."""
+    extension = os.path.splitext(destination_path)[1].lower()
+    if extension == ".m4a":
+        try:
+            return run_ffmpeg(source_path, destination_path, ["-c:a", "copy", "-movflags", "+faststart"], cancel_token)
+        except RuntimeError:
+            # source audio is not AAC (e.g. Opus) - cannot be copied into an M4A container
+            return run_ffmpeg(source_path, destination_path, ["-c:a", "aac", "-b:a", bitrate], cancel_token)
+    if extension == ".mp3":
+        return run_ffmpeg(source_path, destination_path, ["-c:a", "libmp3lame", "-b:a", bitrate], cancel_token)
+
+    raise ValueError(f"Unsupported audio extension: {extension}")
+
+
+def run_ffmpeg(source_path, destination_path, codec_args, cancel_token=None):
+    """Run FFmpeg over the first audio track of `source_path`, dropping any
+    video track. Raise RuntimeError with FFmpeg's message if it fails. If
+    cancel_token is cancelled meanwhile, FFmpeg is killed, its partial output
+    removed and Cancelled raised."""
+    command = [
+        get_ffmpeg_exe(),
+        "-y",
+        "-v",
+        "error",
+        "-i",
+        source_path,
+        "-vn",
+        "-map",
+        "0:a:0",
+        *codec_args,
+        destination_path,
+    ]
+    if cancel_token is None:
+        process = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        stderr = process.stderr
+    else:
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        while True:
+            try:
+                stderr = process.communicate(timeout=CANCEL_POLL_INTERVAL)[1]
+                break
+            except subprocess.TimeoutExpired:
+                if cancel_token.cancelled:
+                    process.kill()
+                    process.communicate()
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(destination_path)
+                    raise Cancelled()
+    if process.returncode != 0:
+        error_message = stderr.decode(errors="replace").strip()
+        raise RuntimeError(f"FFmpeg failed on {source_path}: {error_message}")
+
+    return destination_path
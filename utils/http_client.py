@@ -0,0 +1,54 @@
+import threading
+
+# Connections kept alive per host - at least the number of concurrent workers.
+POOL_SIZE = 32
+# Seconds to establish a connection, and to wait between bytes of the response.
+TIMEOUT = (3, 10)
+# Retries of failed connections and of these response statuses, with exponential backoff.
+RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+_session = None
+_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def get_session(pool_size=POOL_SIZE):
+    """Get the process-wide requests Session shared by every network call.
+    Its per-host connection pools keep connections alive and hold at least
+    `pool_size` connections - the session is rebuilt if a caller needs more."""
+    global _session, _pool_size
+    with _session_lock:
+        if _session is None or pool_size > _pool_size:
+            _session = create_session(pool_size)
+            _pool_size = pool_size
+        return _session
+
+
+def create_session(pool_size=POOL_SIZE, retries=RETRIES):
+    """Create a requests Session with pooled keep-alive connections and a
+    backoff retry policy for idempotent requests."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries,
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(("GET", "HEAD")),
+        raise_on_status=False,  # hand the last response to the caller
+        respect_retry_after_header=False,  # throttling (429) is left to the caller's rate limiter
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get(url, **kwargs):
+    """GET url through the shared session with default timeouts."""
+    kwargs.setdefault("timeout", TIMEOUT)
+    return get_session().get(url, **kwargs)
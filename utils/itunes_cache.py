@@ -0,0 +1,162 @@
+import concurrent.futures
+import json
+import os
+import sqlite3
+import threading
+import time
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "youtube2audio", "itunes.sqlite3")
+# Seconds before a cached search is sent to the iTunes Search API again.
+CACHE_TTL = 24 * 60 * 60
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def normalize_query(term):
+    """Get the cache key of a search term - case and whitespace insensitive."""
+    return " ".join(term.casefold().split())
+
+
+class SearchCache:
+    """SQLite cache of iTunes Search API results keyed by normalized query.
+    Entries expire after `ttl` seconds. Concurrent lookups of one query share
+    a single call to `search` - hits, misses and coalesced lookups are counted
+    in `stats()`. Safe to share between threads."""
+
+    def __init__(self, search, path=CACHE_PATH, ttl=CACHE_TTL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.search = search
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS searches (query TEXT PRIMARY KEY, results TEXT NOT NULL, "
+                "fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, term):
+        """Get the result list of term from the cache, or from `search` on a
+        miss. Exceptions of `search` are raised to every waiting caller and
+        are not cached."""
+        query = normalize_query(term)
+        results, flight, is_leader = self._lookup(query)
+        if results is not None:
+            return results
+        if not is_leader:
+            return flight.result()
+
+        try:
+            results = self.search(term)
+        except BaseException as error:
+            self._finish(query, flight, error=error)
+            raise
+        self._finish(query, flight, results)
+        return results
+
+    async def get_async(self, term, search):
+        """Coroutine version of get() awaiting the coroutine function `search`
+        on a miss. Lookups are coalesced with those of get()."""
+        import asyncio
+
+        query = normalize_query(term)
+        results, flight, is_leader = self._lookup(query)
+        if results is not None:
+            return results
+        if not is_leader:
+            return await asyncio.wrap_future(flight)
+
+        try:
+            results = await search(term)
+        except BaseException as error:
+            self._finish(query, flight, error=error)
+            raise
+        self._finish(query, flight, results)
+        return results
+
+    def stats(self):
+        """Get hit, miss and coalesced lookup counts."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced}
+
+    def clear(self):
+        """Remove every cached search and reset the counters."""
+        with self._lock:
+            self.hits = self.misses = self.coalesced = 0
+            try:
+                with self._connection:
+                    self._connection.execute("DELETE FROM searches")
+            except sqlite3.Error as error:
+                print(f"Error: {str(error)}")  # poor man's logging
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _lookup(self, query):
+        """Get (cached results, None, False) on a hit - else (None, flight,
+        is_leader) where only the leader calls search and finishes flight."""
+        with self._lock:
+            results = self._read(query)
+            if results is not None:
+                self.hits += 1
+                return results, None, False
+            flight = self._in_flight.get(query)
+            if flight is not None:
+                self.coalesced += 1
+                return None, flight, False
+            self.misses += 1
+            flight = self._in_flight[query] = concurrent.futures.Future()
+            return None, flight, True
+
+    def _finish(self, query, flight, results=None, error=None):
+        """Hand the search outcome to coalesced callers and cache results."""
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(results)
+            self._write(query, results)
+        with self._lock:
+            del self._in_flight[query]
+
+    def _read(self, query):
+        """Get unexpired cached results - None if absent or expired."""
+        try:
+            row = self._connection.execute(
+                "SELECT results, fetched_at FROM searches WHERE query = ?", (query,)
+            ).fetchone()
+        except sqlite3.Error as error:
+            print(f"Error: {str(error)}")  # poor man's logging
+            return None
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def _write(self, query, results):
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO searches VALUES (?, ?, ?)", (query, json.dumps(results), time.time())
+                )
+        except sqlite3.Error as error:
+            print(f"Error: {str(error)}")  # poor man's logging
+
+
+def get_search_cache(search):
+    """Get the process-wide iTunes search cache, opened on first use -
+    falls back to an in-memory cache if the database cannot be opened."""
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            try:
+                _search_cache = SearchCache(search)
+            except (OSError, sqlite3.Error) as error:
+                print(f"Error: {str(error)}")  # poor man's logging
+                _search_cache = SearchCache(search, ":memory:")
+        return _search_cache
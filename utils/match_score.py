@@ -0,0 +1,73 @@
+import difflib
+import re
+
+from utils.normalize_title import normalize_name, parse_title
+
+# Weights of the parts of a candidate score - they sum to 1.
+TRACK_WEIGHT = 0.4
+ARTIST_WEIGHT = 0.3
+DURATION_WEIGHT = 0.2
+ALBUM_WEIGHT = 0.1
+# Seconds of duration difference at which the duration score drops to 0 -
+# music videos often run longer than the album track.
+DURATION_TOLERANCE = 60
+# Matches scoring below this are flagged for review.
+LOW_CONFIDENCE = 0.6
+
+_COMPILATION = re.compile(
+    r"\b(?:greatest hits|best of|hits|collection|anthology|essentials?|karaoke|tribute|compilation|now that's)\b",
+    re.IGNORECASE,
+)
+
+
+def similarity(first, second):
+    """Get the 0 - 1 similarity of two names, ignoring case, whitespace,
+    version suffixes and bracketed/feat. noise. Names are not split into
+    artist and track - parse the video title before."""
+    first, second = (normalize_name(name or "").casefold() for name in (first, second))
+    if not first or not second:
+        return 0.0
+    return difflib.SequenceMatcher(None, first, second).ratio()
+
+
+def score_candidate(parsed_title, duration, track):
+    """Get the 0 - 1 score of an itunespy Track (track_time in minutes) as
+    the match of a parsed video title and video duration in seconds."""
+    track_name = getattr(track, "track_name", "")
+    artist_name = getattr(track, "artist_name", "")
+    if parsed_title["artist"]:
+        title_score = max(
+            TRACK_WEIGHT * similarity(parsed_title["track"], track_name)
+            + ARTIST_WEIGHT * similarity(parsed_title["artist"], artist_name),
+            # titles in "Track - Artist" order
+            TRACK_WEIGHT * similarity(parsed_title["artist"], track_name)
+            + ARTIST_WEIGHT * similarity(parsed_title["track"], artist_name),
+        )
+    else:
+        # no separator - the title may still name the artist
+        artist_score = 1.0 if artist_name and artist_name.casefold() in parsed_title["track"].casefold() else 0.0
+        title_score = TRACK_WEIGHT * similarity(parsed_title["track"], track_name) + ARTIST_WEIGHT * artist_score
+
+    track_time = getattr(track, "track_time", None)
+    if duration and track_time:
+        duration_score = max(0.0, 1 - abs(duration - track_time * 60) / DURATION_TOLERANCE)
+    else:
+        duration_score = 0.5  # unknown - neither reward nor punish
+
+    album_score = 0.0 if _COMPILATION.search(getattr(track, "collection_name", "")) else 1.0
+    return title_score + DURATION_WEIGHT * duration_score + ALBUM_WEIGHT * album_score
+
+
+def rank_candidates(vid_title, duration, tracks):
+    """Get (score, track) of every candidate track, best match first.
+    Equal scores keep the search result order."""
+    parsed_title = parse_title(vid_title)
+    scored = [(score_candidate(parsed_title, duration, track), track) for track in tracks]
+    return sorted(scored, key=lambda scored_track: scored_track[0], reverse=True)
+
+
+def best_match(vid_title, duration, tracks):
+    """Get (score, track) of the best matching candidate - (0, None) if
+    there are no candidates."""
+    ranked = rank_candidates(vid_title, duration, tracks)
+    return ranked[0] if ranked else (0.0, None)
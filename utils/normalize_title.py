@@ -0,0 +1,70 @@
+import re
+
+# Bracketed parts of video titles that never appear in iTunes track names,
+# e.g. "(Official Music Video)", "[HD]", "(Lyrics)", "【MV】".
+_NOISE_WORDS = (
+    r"official|music|video|audio|lyrics?|lyric video|visuali[sz]er|hd|hq|4k|1080p|720p|mv|m/v|"
+    r"remaster(?:ed)?|full album|explicit|clean|live|performance|clip officiel|color coded"
+)
+_BRACKETED_NOISE = re.compile(
+    rf"\s*[(\[【]\s*(?:[\w\s]*?\b(?:{_NOISE_WORDS})\b[\w\s'./-]*)[)\]】]",
+    re.IGNORECASE,
+)
+# Unbracketed noise at the end of a title, e.g. "Song Official Video HD".
+_TRAILING_NOISE = re.compile(
+    r"(?:\s+(?:official|music|video|audio|lyrics?|hd|hq|4k|mv))+\s*$",
+    re.IGNORECASE,
+)
+# Trailing "| channel name" or "// extra" sections.
+_TRAILING_SECTION = re.compile(r"\s+(?:\||//)\s.*$")
+# "feat. X", "ft X", "featuring X" - optionally bracketed.
+_FEATURING = re.compile(
+    r"\s*[(\[]?\s*\b(?:feat\.?|ft\.?|featuring)\s+([^)\]]+?)\s*(?:[)\]]|$)",
+    re.IGNORECASE,
+)
+# " - Remastered 2011", " - Single Version", " - Radio Edit" suffixes of iTunes track names.
+_VERSION_SUFFIX = re.compile(
+    r"\s+[-–—]\s+[^-–—]*\b(?:remaster(?:ed)?|version|edit|mix|live|mono|stereo|single|acoustic|demo)\b[^-–—]*$",
+    re.IGNORECASE,
+)
+# Separators between artist and track: "-", "–", "—", "~".
+_ARTIST_SEPARATOR = re.compile(r"\s+[-–—~]\s+|\s*[–—]\s*")
+_QUOTES = re.compile(r"[\"“”‘’]|(?:^|\s)'|'(?=\s|$)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def parse_title(title):
+    """Split a YouTube video title into artist, track and featured artists.
+    Noise such as "(Official Music Video) [HD]" is removed - artist is empty
+    if the title has no "Artist - Track" separator."""
+    title = _TRAILING_SECTION.sub("", title)
+    title = _BRACKETED_NOISE.sub("", title)
+
+    parts = _ARTIST_SEPARATOR.split(title, maxsplit=1)
+    artist, track = parts if len(parts) == 2 else ("", parts[0])
+    # split first - an unbracketed "ft. X" runs to the end of its part only
+    featuring = [name.strip() for part in (artist, track) for name in _FEATURING.findall(part)]
+    artist, track = _FEATURING.sub("", artist), _FEATURING.sub("", track)
+    track = _TRAILING_NOISE.sub("", _QUOTES.sub(" ", track))
+    artist = _QUOTES.sub(" ", artist)
+    return {
+        "artist": _WHITESPACE.sub(" ", artist).strip(),
+        "track": _WHITESPACE.sub(" ", track).strip(),
+        "featuring": featuring,
+    }
+
+
+def normalize_name(name):
+    """Remove version suffixes such as " - Remastered 2011", bracketed noise
+    and featured artists from an iTunes track or artist name. Unlike
+    parse_title, the name is not split on " - "."""
+    name = _BRACKETED_NOISE.sub("", name)
+    name = _VERSION_SUFFIX.sub("", name)
+    name = _FEATURING.sub("", name)
+    return _WHITESPACE.sub(" ", _QUOTES.sub(" ", name)).strip()
+
+
+def get_search_term(title):
+    """Get an iTunes search term - "artist track" - from a video title."""
+    parsed_title = parse_title(title)
+    return " ".join(part for part in (parsed_title["artist"], parsed_title["track"]) if part) or title.strip()
@@ -0,0 +1,92 @@
+import threading
+import time
+
+from utils.cancellation import Cancelled
+
+# Stages a track passes through, in order.
+STAGES = ("download", "transcode", "tag")
+# Minimum seconds between two progress reports.
+REPORT_INTERVAL = 0.25
+
+
+class DownloadProgress:
+    """Thread-safe aggregate of per-track download progress. Collects track
+    events from pipeline workers and hands callback(summary) at most once per
+    `interval` seconds, and once more when every track is finished. Each
+    summary holds the tracks changed since the previous one and totals with
+    throughput (bytes/s) and ETA (seconds)."""
+
+    def __init__(self, track_count, callback=None, interval=REPORT_INTERVAL):
+        self.track_count = track_count
+        self.callback = callback or (lambda summary: None)
+        self.interval = interval
+        self.tracks = {}
+        self._changed = set()
+        self._lock = threading.Lock()
+        self._time0 = time.monotonic()
+        self._last_report = 0
+
+    def stage(self, index, stage_index, error=None):
+        """Record a track entering stage_index of STAGES, leaving the last
+        stage (stage_index == len(STAGES)), or failing with error - Cancelled
+        tracks are recorded as cancelled, not failed. Matches the map_stages
+        report signature."""
+        if isinstance(error, Cancelled):
+            self._update(index, stage="cancelled")
+        elif error is not None:
+            # pipeline stages wrap the original exception in a RuntimeError
+            reason = str(error.__cause__ or error) or type(error).__name__
+            self._update(index, stage="failed", error=reason)
+        elif stage_index >= len(STAGES):
+            self._update(index, stage="done")
+        else:
+            self._update(index, stage=STAGES[stage_index])
+
+    def received(self, index, bytes_received, bytes_total):
+        """Record bytes received of a track download."""
+        self._update(index, bytes_received=bytes_received, bytes_total=bytes_total)
+
+    def summary(self):
+        """Get progress totals across all tracks."""
+        with self._lock:
+            return self._summary(set(self.tracks))
+
+    def _update(self, index, **fields):
+        with self._lock:
+            track = self.tracks.setdefault(
+                index, {"stage": "download", "bytes_received": 0, "bytes_total": 0, "error": None}
+            )
+            track.update(fields)
+            self._changed.add(index)
+            finished = sum(track["stage"] in ("done", "failed", "cancelled") for track in self.tracks.values())
+            now = time.monotonic()
+            if now - self._last_report < self.interval and finished < self.track_count:
+                return
+            self._last_report = now
+            summary = self._summary(self._changed)
+            self._changed = set()
+            # report under the lock so summaries arrive in order
+            self.callback(summary)
+
+    def _summary(self, changed):
+        bytes_received = sum(track["bytes_received"] for track in self.tracks.values())
+        bytes_total = sum(track["bytes_total"] for track in self.tracks.values())
+        sized_tracks = sum(bool(track["bytes_total"]) for track in self.tracks.values())
+        elapsed = time.monotonic() - self._time0
+        throughput = bytes_received / elapsed if elapsed else 0
+        eta = None
+        if throughput and sized_tracks:
+            # estimate size of tracks not yet started from the average of started ones
+            estimated_total = bytes_total / sized_tracks * self.track_count
+            eta = max(0, estimated_total - bytes_received) / throughput
+        return {
+            "tracks": {index: dict(self.tracks[index]) for index in changed},
+            "total": self.track_count,
+            "completed": sum(track["stage"] == "done" for track in self.tracks.values()),
+            "failed": sum(track["stage"] == "failed" for track in self.tracks.values()),
+            "cancelled": sum(track["stage"] == "cancelled" for track in self.tracks.values()),
+            "bytes_received": bytes_received,
+            "bytes_total": bytes_total,
+            "throughput": throughput,
+            "eta": eta,
+        }
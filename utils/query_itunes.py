@@ -1,41 +1,72 @@
 from json.decoder import JSONDecodeError
 
-import itunespy
-import requests
+from utils import http_client
+from utils.itunes_cache import get_search_cache
+from utils.match_score import LOW_CONFIDENCE, best_match
+from utils.normalize_title import get_search_term
+from utils.rate_limiter import RateLimiter
+
+ITUNES_SEARCH_URL = "https://itunes.apple.com/search"
+OEMBED_URL = "https://www.youtube.com/oembed"
+# The Search API allows roughly 20 calls per minute per client.
+ITUNES_CALLS_PER_MINUTE = 20
+ITUNES_BURST = 5
+# Throttled (403/429) searches are queued again up to ITUNES_RETRIES times,
+# after Retry-After or ITUNES_BACKOFF * 2 ** attempt seconds.
+ITUNES_RETRIES = 5
+ITUNES_BACKOFF = 10
+THROTTLED_STATUSES = (403, 429)
+
+# Shared by every annotation worker.
+itunes_rate_limiter = RateLimiter(ITUNES_CALLS_PER_MINUTE / 60, ITUNES_BURST)
 
 
 def thread_query_itunes(args):
     row_index = args[0]
     key_value = args[1]
+    vid_title = key_value[0]
     url_id = key_value[1]["id"]
     vid_url = f"https://www.youtube.com/watch?v={url_id}"
-    ITUNES_META_JSON = get_itunes_metadata(vid_url)
+    ITUNES_META_JSON = get_itunes_metadata(vid_url, vid_title, key_value[1].get("duration"))
 
     return (row_index, ITUNES_META_JSON)
 
 
-def get_itunes_metadata(vid_url):
-    """Get iTunes metadata to add to MP3/MP4 file."""
-    vid_title = oembed_title(vid_url)
-    try:
-        ITUNES_META = query_itunes(vid_title)[0]
-    except TypeError:  # i.e. no information fetched from query_itunes
+def get_itunes_metadata(vid_url, vid_title=None, duration=None):
+    """Get iTunes metadata to add to MP3/MP4 file - the best scoring search
+    result for the video title and duration (seconds). The video title is
+    fetched with oEmbed only if vid_title is not given."""
+    if not vid_title:
+        vid_title = oembed_title(vid_url)
+        if not vid_title:
+            return None
+    search_term = get_search_term(vid_title)
+    itunes_results = query_itunes(search_term)
+    if not itunes_results and search_term != vid_title:
+        itunes_results = query_itunes(vid_title)  # e.g. titles in "Track - Artist" order
+    if not itunes_results:  # i.e. no information fetched from query_itunes
         return None
 
+    match_score, ITUNES_META = best_match(vid_title, duration, itunes_results)
+    return get_itunes_meta_json(ITUNES_META, match_score)
+
+
+def get_itunes_meta_json(itunes_meta, match_score=None):
+    """Get the metadata we tag files with from an itunespy Track, with the
+    match score of the Track and whether it is below LOW_CONFIDENCE if given."""
     ITUNES_META_JSON = {
-        "track_name": ITUNES_META.track_name,
-        "album_name": ITUNES_META.collection_name,
-        "artist_name": ITUNES_META.artist_name,
-        "primary_genre_name": ITUNES_META.primary_genre_name,
-        "artwork_url_fullres": ITUNES_META.artwork_url_60.replace(
+        "track_name": itunes_meta.track_name,
+        "album_name": itunes_meta.collection_name,
+        "artist_name": itunes_meta.artist_name,
+        "primary_genre_name": itunes_meta.primary_genre_name,
+        "artwork_url_fullres": itunes_meta.artwork_url_60.replace(
             "60", "600"
         ),  # manually replace album artwork to 600x600
     }
-
-    # get artwork content from iTunes artwork url
-    response = requests.get(ITUNES_META_JSON["artwork_url_fullres"])
-    album_img = response.content
-    ITUNES_META_JSON["artwork_bytes_fullres"] = album_img
+    # artwork content is fetched from the url when a row is displayed or a file is tagged
+    if match_score is not None:
+        ITUNES_META_JSON["match_score"] = round(match_score, 2)
+        ITUNES_META_JSON["low_confidence"] = match_score < LOW_CONFIDENCE
 
     return ITUNES_META_JSON
 
@@ -44,14 +75,15 @@ def oembed_title(vid_url):
     """Get YouTube video title information if input str
     is a url - else return input descriptor str from
     get_itunes_metadata."""
+    import requests
+
     if vid_url.startswith("https://"):
         # oEmbed is a format for allowing an embedded representation
         # of a URL on third party sites.
-        oembed_url = f"https://www.youtube.com/oembed?url={vid_url}&format=json"
         try:
-            vid_content = requests.get(oembed_url)
+            vid_content = http_client.get(OEMBED_URL, params={"url": vid_url, "format": "json"})
             vid_json = vid_content.json()
-        except (requests.exceptions.ConnectionError, JSONDecodeError):
+        except (requests.exceptions.RequestException, JSONDecodeError):
             return None
 
         return vid_json["title"]
@@ -62,10 +94,59 @@ def oembed_title(vid_url):
 def query_itunes(song_properties):
     """Download video metadata using itunespy."""
     try:
-        song_itunes = itunespy.search_track(song_properties)
+        song_itunes = search_track(song_properties)
         # Before returning convert all the track_time values to minutes.
-        for song in song_itunes:
-            song.track_time = round(song.track_time / 60000, 2)
-        return song_itunes
+        return set_track_minutes(song_itunes)
     except Exception:
         return None
+
+
+def set_track_minutes(song_itunes):
+    """Convert the track_time of itunespy Tracks from milliseconds to minutes."""
+    for song in song_itunes:
+        song.track_time = round(song.track_time / 60000, 2)
+    return song_itunes
+
+
+def search_track(term):
+    """Search songs in the iTunes Store through the shared HTTP session and
+    the iTunes search cache. Return itunespy Track results, as
+    itunespy.search_track does."""
+    from itunespy.track import Track
+
+    results = get_search_cache(fetch_search_results).get(term)
+    if not results:
+        raise LookupError(f"No iTunes results for {term}")
+    return [Track(item) for item in results]
+
+
+def fetch_search_results(term, rate_limiter=None, retries=ITUNES_RETRIES):
+    """Get the raw result list of an iTunes Search API song search. Calls
+    wait for rate_limiter (default: the shared itunes_rate_limiter) and are
+    retried with backoff while throttled."""
+    rate_limiter = rate_limiter or itunes_rate_limiter
+    params = get_search_params(term)
+    for attempt in range(retries + 1):
+        rate_limiter.acquire()
+        response = http_client.get(ITUNES_SEARCH_URL, params=params)
+        if response.status_code not in THROTTLED_STATUSES or attempt == retries:
+            break
+        retry_after = get_retry_after(response)
+        rate_limiter.backoff(ITUNES_BACKOFF * 2**attempt if retry_after is None else retry_after)
+
+    response.raise_for_status()
+    rate_limiter.success()
+    return response.json()["results"]
+
+
+def get_search_params(term):
+    """Get iTunes Search API query parameters of a song search."""
+    return {"term": term, "country": "US", "media": "music", "entity": "song", "limit": 50}
+
+
+def get_retry_after(response):
+    """Get seconds of a numeric Retry-After header - None if absent."""
+    try:
+        return int(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
@@ -1,32 +1,125 @@
+import concurrent.futures
+import random
 import re
-import urllib
+import time
+import urllib.error
 
-import youtube_dl
-from pytube import Playlist
-from utils._threading import map_threads
+from utils.video_cache import get_video_cache, get_video_id
 
+# Load playlists from their pages (title, id and duration of every video)
+# instead of one extract_info call per video.
+FLAT_PLAYLIST = True
+# Videos per batch yielded by iter_youtube_content.
+LOAD_BATCH_SIZE = 10
+# Retries of a video whose metadata failed to load, each after a random
+# delay of up to RETRY_BACKOFF * 2 ** attempt seconds.
+VIDEO_RETRIES = 3
+RETRY_BACKOFF = 1
+# Errors of videos that retrying cannot load.
+PERMANENT_ERRORS = ("not a valid URL", "Unsupported URL", "unavailable", "Private video", "removed")
 
-def get_youtube_content(youtube_url, override_error):
+
+def get_youtube_content(youtube_url, override_error, use_cache=True, flat_playlist=FLAT_PLAYLIST):
     """Str parse YouTube url and call appropriate functions
-    to execute url content."""
-    if ".com/playlist" in youtube_url:
-        url_tuple = get_playlist_video_info(youtube_url)
-        # concatenate override_error argument to url_tuple
-        url_tuple = tuple((url, override_error) for url in url_tuple)
-        video_genr = map_threads(get_video_info, url_tuple)
-        video_info = list(video_genr)
+    to execute url content. Video metadata is read from the video
+    cache unless use_cache is False."""
+    videos_dict = {}
+    for videos_batch in iter_youtube_content(youtube_url, override_error, use_cache, flat_playlist):
+        videos_dict.update(videos_batch)
+    return videos_dict
+
+
+def iter_youtube_content(
+    youtube_url, override_error, use_cache=True, flat_playlist=FLAT_PLAYLIST, batch_size=LOAD_BATCH_SIZE, failures=None
+):
+    """Same as get_youtube_content, but yield the videos dict in batches of
+    up to batch_size videos as soon as their metadata is loaded. Batches
+    follow playlist order. If a failures dict is given, videos that fail to
+    load are skipped and added to it as url: error message."""
+    if ".com/playlist" in youtube_url and flat_playlist:
+        video_slots = get_flat_playlist_info(youtube_url, override_error, use_cache)
+    elif ".com/playlist" in youtube_url:
+        # concatenate override_error and use_cache arguments to every url
+        video_slots = [(url, override_error, use_cache) for url in get_playlist_video_info(youtube_url)]
     else:
         adj_youtube_url = youtube_url.split("&")[0]  # trim ascii encoding "&"
         # set get_video_info parameter as tuple to comply with multithreading parameter (tuple)
-        url_tuple = (adj_youtube_url, override_error)
-        video_json = get_video_info(url_tuple)
-        video_info = [video_json]
+        video_slots = [(adj_youtube_url, override_error, use_cache)]
+
+    yield from iter_video_batches(video_slots, batch_size, failures)
+
 
-    return video_content_to_dict(video_info)
+def iter_video_batches(video_slots, batch_size=LOAD_BATCH_SIZE, failures=None):
+    """Yield videos dicts of consecutive video slots - each a video metadata
+    dict, or get_video_info arguments fetched on a thread pool. Fetches
+    complete in any order and are reordered to slot order, so a batch is
+    yielded once its videos and every video before them are loaded.
+    Failed fetches raise RuntimeError, or are added to failures if given."""
+    loaded = {}  # slot index: video metadata waiting for earlier slots
+    next_index = 0
+    batch = []
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = {}
+        for index, slot in enumerate(video_slots):
+            if isinstance(slot, tuple):
+                futures[executor.submit(get_video_info_retrying, slot)] = index
+            else:
+                loaded[index] = slot
+        completed = concurrent.futures.as_completed(futures)
+
+        while next_index < len(video_slots):
+            if next_index not in loaded:
+                future = next(completed)
+                index = futures[future]
+                try:
+                    loaded[index] = future.result()
+                except RuntimeError as error:
+                    if failures is None:
+                        raise
+                    failures[video_slots[index][0]] = str(error)
+                    loaded[index] = None
+                continue
+            batch.append(loaded.pop(next_index))
+            next_index += 1
+            if len(batch) >= batch_size:
+                yield video_content_to_dict(batch)
+                batch = []
+
+    if batch:
+        yield video_content_to_dict(batch)
+
+
+def get_flat_playlist_info(playlist_url, override_error, use_cache=True):
+    """Get title, id and duration of videos in a YouTube playlist from the
+    playlist pages alone - streams are resolved at download time. Entries
+    the pages leave incomplete are returned as get_video_info arguments."""
+    import youtube_dl
+
+    ydl_opts = {"extract_flat": "in_playlist", "ignoreerrors": override_error, "quiet": True}
+    try:
+        with youtube_dl.YoutubeDL(ydl_opts) as ydl:
+            playlist_info = ydl.extract_info(playlist_url, download=False)
+    except (youtube_dl.utils.DownloadError, UnicodeError) as error:
+        raise RuntimeError(error)
+    if not playlist_info:
+        raise RuntimeError(f"Could not load playlist {playlist_url}")
+
+    video_slots = []
+    for entry in playlist_info.get("entries") or ():
+        if not entry or not entry.get("id"):
+            continue
+        if entry.get("title") and entry.get("duration"):
+            video_slots.append({"title": entry["title"], "id": entry["id"], "duration": entry["duration"]})
+        else:
+            # e.g. private, deleted or live videos
+            video_slots.append((f"https://www.youtube.com/watch?v={entry['id']}", override_error, use_cache))
+    return video_slots
 
 
 def get_playlist_video_info(playlist_url):
     """Get url of videos in a YouTube playlist."""
+    from pytube import Playlist
+
     try:
         playlist = Playlist(playlist_url)
         playlist._video_regex = re.compile(
@@ -45,10 +138,32 @@ def get_playlist_video_info(playlist_url):
     return video_urls
 
 
+def get_video_info_retrying(args):
+    """Get YouTube video metadata, retrying transient errors VIDEO_RETRIES
+    times with exponential backoff and jitter."""
+    for attempt in range(VIDEO_RETRIES + 1):
+        try:
+            return get_video_info(args)
+        except RuntimeError as error:
+            if attempt == VIDEO_RETRIES or any(message in str(error) for message in PERMANENT_ERRORS):
+                raise
+        time.sleep(random.uniform(0, RETRY_BACKOFF * 2**attempt))
+
+
 def get_video_info(args):
-    """Get YouTube video metadata."""
+    """Get YouTube video metadata - from the video cache if present and
+    args[2] (use_cache) is not False. Fetched metadata is always cached."""
     video_url = args[0]
     override_error = args[1]
+    use_cache = args[2] if len(args) > 2 else True
+    video_id = get_video_id(video_url)
+    video_cache = get_video_cache() if video_id else None
+    if use_cache and video_cache:
+        video_info = video_cache.get(video_id)
+        if video_info:
+            return video_info
+
+    import youtube_dl
 
     ydl_opts = {"ignoreerrors": False, "quiet": True}
     if override_error:
@@ -58,6 +173,8 @@ def get_video_info(args):
     try:
         with youtube_dl.YoutubeDL(ydl_opts) as ydl:
             video_info = ydl.extract_info(video_url, download=False)
+        if video_info and video_cache:
+            video_cache.put(video_info)
         return video_info
     # video unavailable or bad url format
     except (youtube_dl.utils.DownloadError, UnicodeError) as error:
@@ -67,5 +184,10 @@ def get_video_info(args):
 
 
 def video_content_to_dict(vid_info_list):
-    """Convert YouTube metadata list to dictionary."""
-    return {video["title"]: {"id": video["id"], "duration": video["duration"]} for video in vid_info_list if video}
+    """Convert YouTube metadata list to dictionary keyed by video id - videos
+    sharing a title keep a row each."""
+    return {
+        video["id"]: {"title": video["title"], "id": video["id"], "duration": video["duration"]}
+        for video in vid_info_list
+        if video
+    }
@@ -0,0 +1,68 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket shared by every thread calling one API. Holds up to
+    `burst` tokens refilled at `rate` tokens per second. backoff() pauses
+    all callers and halves the rate; success() raises it back towards
+    `rate` in steps, so workers settle at the highest rate the API allows."""
+
+    def __init__(self, rate, burst=1, min_rate=None):
+        self.max_rate = rate
+        self.min_rate = min_rate or rate / 8
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a call may be made."""
+        delay = self._reserve()
+        while delay:
+            time.sleep(delay)
+            delay = self._reserve()
+
+    async def acquire_async(self):
+        """Coroutine version of acquire() sharing the same bucket."""
+        import asyncio
+
+        delay = self._reserve()
+        while delay:
+            await asyncio.sleep(delay)
+            delay = self._reserve()
+
+    def backoff(self, delay):
+        """Pause every caller for delay seconds and halve the rate - call
+        when the API answers that it is throttling."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self._tokens = 0
+            self._blocked_until = max(self._blocked_until, now + delay)
+            # no tokens build up while paused - a full burst would be throttled again
+            self._refilled_at = self._blocked_until
+            self.rate = max(self.rate / 2, self.min_rate)
+
+    def success(self):
+        """Raise the rate by an eighth of the maximum after an accepted call."""
+        with self._lock:
+            self.rate = min(self.rate + self.max_rate / 8, self.max_rate)
+
+    def _reserve(self):
+        """Take a token - return 0, or seconds to wait before trying again."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def _refill(self, now):
+        self._tokens = min(self._tokens + (now - self._refilled_at) * self.rate, self.burst)
+        self._refilled_at = now
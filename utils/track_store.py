@@ -0,0 +1,138 @@
+# Table columns, in display order.
+FIELDS = ("song", "album", "artist", "genre", "artwork")
+# Every per-row list of a TrackStore.
+COLUMNS = ("ids", "titles", "match_score", "low_confidence") + FIELDS
+UNKNOWN = "Unknown"
+
+
+class TrackStore:
+    """Columnar store of the playlist table - one list per field instead of
+    one object per cell, with row i of every list belonging to track i.
+    Rows are keyed by video id - the stable handle of a row while rows
+    around it are removed - and `titles` holds the video title of each row.
+    An id to row map is kept up to date for O(1) lookups."""
+
+    __slots__ = COLUMNS + ("_rows",)
+
+    def __init__(self):
+        self.clear()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, video_id):
+        return video_id in self._rows
+
+    def clear(self):
+        for name in COLUMNS:
+            setattr(self, name, [])
+        self._rows = {}
+
+    def row(self, video_id):
+        """Get the current row of a video id - None if it was removed."""
+        return self._rows.get(video_id)
+
+    def extend(self, videos):
+        """Append one row per video dict of a new video id, with the title as
+        song name and every other field Unknown."""
+        videos = list(videos)
+        titles = [video["title"] for video in videos]
+        for row, video in enumerate(videos, len(self.ids)):
+            self._rows[video["id"]] = row
+        self.ids.extend(video["id"] for video in videos)
+        self.titles.extend(titles)
+        self.song.extend(titles)
+        for field in FIELDS[1:]:
+            getattr(self, field).extend([UNKNOWN] * len(titles))
+        self.match_score.extend([None] * len(titles))
+        self.low_confidence.extend([False] * len(titles))
+
+    def get(self, row, column):
+        """Get the value of a cell - column is an index of FIELDS."""
+        return getattr(self, FIELDS[column])[row]
+
+    def set(self, row, column, value):
+        getattr(self, FIELDS[column])[row] = value
+
+    def song_properties(self, row):
+        """Get the fields of a row as song properties of a download."""
+        return {field: getattr(self, field)[row] for field in FIELDS}
+
+    def set_itunes_meta(self, row, ITUNES_META_JSON):
+        """Set the fields of a row to its iTunes annotation - if there is
+        none, keep the song name and set every other field Unknown."""
+        if ITUNES_META_JSON:
+            self.song[row] = ITUNES_META_JSON["track_name"]
+            self.album[row] = ITUNES_META_JSON["album_name"]
+            self.artist[row] = ITUNES_META_JSON["artist_name"]
+            self.genre[row] = ITUNES_META_JSON["primary_genre_name"]
+            self.artwork[row] = ITUNES_META_JSON["artwork_url_fullres"]
+            self.match_score[row] = ITUNES_META_JSON.get("match_score")
+            self.low_confidence[row] = ITUNES_META_JSON.get("low_confidence", False)
+            return
+        self.song[row] = self.song[row] or UNKNOWN
+        for field in FIELDS[1:]:
+            getattr(self, field)[row] = UNKNOWN
+        self.match_score[row] = None
+        self.low_confidence[row] = False
+
+    def reset(self):
+        """Set every row back to its default - the title as song name."""
+        row_count = len(self.titles)
+        self.song[:] = self.titles
+        for field in FIELDS[1:]:
+            getattr(self, field)[:] = [UNKNOWN] * row_count
+        self.match_score[:] = [None] * row_count
+        self.low_confidence[:] = [False] * row_count
+
+    def set_many(self, rows, values, fill_empty=True):
+        """Set fields of every row in one batch - values is {column: value}.
+        Empty fields are left as they are unless fill_empty. Return an undo
+        record of the previous values for restore()."""
+        previous = {}
+        for column, value in values.items():
+            field_values = getattr(self, FIELDS[column])
+            previous[column] = [field_values[row] for row in rows]
+            for row in rows:
+                if fill_empty or field_values[row]:
+                    field_values[row] = value
+        return [self.ids[row] for row in rows], previous
+
+    def replace_all(self, rows, replacement_row):
+        """Set every non-empty field, except songs, of rows to the field of
+        replacement_row. Return the undo record of set_many."""
+        values = {
+            column: getattr(self, field)[replacement_row]
+            for column, field in enumerate(FIELDS)
+            if column and getattr(self, field)[replacement_row]
+        }
+        return self.set_many(rows, values, fill_empty=False)
+
+    def restore(self, undo_record):
+        """Set fields back to the values of an undo record - rows removed
+        since are skipped. Return the restored rows."""
+        video_ids, previous = undo_record
+        rows = [self._rows.get(video_id) for video_id in video_ids]
+        for column, values in previous.items():
+            field_values = getattr(self, FIELDS[column])
+            for row, value in zip(rows, values):
+                if row is not None:
+                    field_values[row] = value
+        return [row for row in rows if row is not None]
+
+    def remove(self, rows):
+        """Remove rows by index in one pass over the rows after the first
+        removed row - only their positions in the id to row map change."""
+        removed = set(rows)
+        if not removed:
+            return
+        first_row = min(removed)
+        for video_id in (self.ids[row] for row in removed):
+            del self._rows[video_id]
+        for name in COLUMNS:
+            values = getattr(self, name)
+            values[first_row:] = [
+                value for row, value in enumerate(values[first_row:], first_row) if row not in removed
+            ]
+        for row, video_id in enumerate(self.ids[first_row:], first_row):
+            self._rows[video_id] = row
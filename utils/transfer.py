@@ -0,0 +1,192 @@
+import concurrent.futures
+import contextlib
+import json
+import math
+import os
+import threading
+import time
+
+from utils import http_client
+from utils.cancellation import Cancelled
+
+# Bytes requested per Range request - YouTube throttles long unranged responses.
+REQUEST_RANGE_SIZE = 9 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+RETRIES = 3
+# Segmented downloads - one connection per SEGMENT_SIZE bytes of the stream, at most MAX_SEGMENTS.
+SEGMENT_SIZE = 16 * 1024 * 1024
+MAX_SEGMENTS = 8
+
+
+class RangeNotSupportedError(RuntimeError):
+    """Server answered a partial Range request with the whole content."""
+
+
+def get_segment_count(filesize, segment_size=SEGMENT_SIZE, max_segments=MAX_SEGMENTS):
+    """Get number of concurrent segments to split a stream of filesize into."""
+    return max(1, min(max_segments, math.ceil(filesize / segment_size)))
+
+
+def split_ranges(size, segments):
+    """Split size bytes into contiguous [start, end) ranges."""
+    bounds = [size * index // segments for index in range(segments + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def download_resumable(
+    url,
+    file_path,
+    expected_size,
+    journal_info=None,
+    segments=1,
+    retries=RETRIES,
+    session=None,
+    on_progress=None,
+    cancel_token=None,
+):
+    """Download url to file_path with Range requests, resuming partial data.
+    The stream is split into `segments` byte ranges fetched concurrently into
+    `<file_path>.part`. A journal next to it records `journal_info` (e.g.
+    video id and stream itag), the expected size and the bytes written per
+    segment, so a retry or a later run continues from the last good offset.
+    If given, on_progress(bytes_received, expected_size) is called as chunks
+    arrive, and cancel_token is checked between chunks - a cancelled download
+    removes its partial data and journal. A completed download keeps its
+    journal, marked complete, so only a file of the same journal_info is
+    reused by a later run. Return file_path once complete."""
+    import requests
+
+    on_progress = on_progress or (lambda bytes_received, bytes_total: None)
+    part_path = f"{file_path}.part"
+    journal_info = dict(journal_info or {}, expected_size=expected_size)
+    journal = read_journal(file_path)
+    same_download = journal and all(journal.get(key) == value for key, value in journal_info.items())
+    if (
+        same_download
+        and journal.get("complete")
+        and os.path.exists(file_path)
+        and os.path.getsize(file_path) == expected_size
+    ):
+        on_progress(expected_size, expected_size)
+        return file_path  # completed by an earlier run
+
+    ranges = split_ranges(expected_size, segments)
+    written = [0] * len(ranges)
+    if (
+        same_download
+        and [segment[:2] for segment in journal.get("segments", [])] == [list(bounds) for bounds in ranges]
+        and os.path.exists(part_path)
+    ):
+        written = [segment[2] for segment in journal["segments"]]
+    else:
+        with open(part_path, "wb") as part_file:
+            part_file.truncate(expected_size)
+    session = session or http_client.get_session()
+    journal_lock = threading.Lock()
+    received = [sum(written)]
+
+    def on_chunk(chunk_size):
+        with journal_lock:
+            received[0] += chunk_size
+            on_progress(received[0], expected_size)
+
+    def update_journal(index, bytes_written):
+        with journal_lock:
+            written[index] = bytes_written
+            segment_journal = [[start, end, written[i]] for i, (start, end) in enumerate(ranges)]
+            write_journal(file_path, dict(journal_info, bytes_written=sum(written), segments=segment_journal))
+
+    def download_segment(index):
+        start, end = ranges[index]
+        attempt = 0
+        with open(part_path, "r+b") as part_file:
+            while start + written[index] < end:
+                offset = start + written[index]
+                part_file.seek(offset)
+                try:
+                    fetch_range(session, url, part_file, offset, end, len(ranges) == 1, on_chunk, cancel_token)
+                    attempt = 0
+                except requests.exceptions.RequestException as error:
+                    attempt += 1
+                    if attempt > retries:
+                        raise RuntimeError(f"Download of {file_path} failed at byte {offset}") from error
+                    time.sleep(2 ** (attempt - 1))
+                finally:
+                    part_file.flush()
+                    update_journal(index, part_file.tell() - start)
+
+    try:
+        if len(ranges) == 1:
+            download_segment(0)
+        else:
+            with concurrent.futures.ThreadPoolExecutor(len(ranges)) as executor:
+                for future in [executor.submit(download_segment, index) for index in range(len(ranges))]:
+                    future.result()
+    except RangeNotSupportedError:
+        # segments cannot be fetched separately - fall back to a single connection
+        remove_journal(file_path)
+        return download_resumable(
+            url, file_path, expected_size, journal_info, 1, retries, session, on_progress, cancel_token
+        )
+    except Cancelled:
+        remove_journal(file_path)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(part_path)
+        raise
+
+    os.replace(part_path, file_path)
+    write_journal(file_path, dict(journal_info, complete=True))
+    return file_path
+
+
+def fetch_range(session, url, part_file, offset, end, whole_file=True, on_chunk=None, cancel_token=None):
+    """Request the next Range of [offset, end) and write it at the
+    current position of part_file, calling on_chunk(size) per chunk.
+    Raise Cancelled between chunks once cancel_token is cancelled."""
+    import requests
+
+    range_end = min(offset + REQUEST_RANGE_SIZE, end) - 1
+    headers = {"Range": f"bytes={offset}-{range_end}"}
+    with session.get(url, headers=headers, stream=True, timeout=http_client.TIMEOUT) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            if not whole_file:
+                raise RangeNotSupportedError(f"Server ignored Range request for {url}")
+            # server ignored Range - start over from the first byte
+            part_file.seek(0)
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if cancel_token is not None:
+                cancel_token.check()
+            part_file.write(chunk)
+            if on_chunk:
+                on_chunk(len(chunk))
+    if part_file.tell() <= offset:
+        raise requests.exceptions.ConnectionError(f"Empty response for range {offset}-{range_end}")
+
+
+def get_journal_path(file_path):
+    return f"{file_path}.journal.json"
+
+
+def read_journal(file_path):
+    """Get partial download journal of file_path - None if absent or corrupt."""
+    try:
+        with open(get_journal_path(file_path)) as journal_file:
+            return json.load(journal_file)
+    except (OSError, ValueError):
+        return None
+
+
+def write_journal(file_path, journal):
+    """Atomically replace the partial download journal of file_path."""
+    journal_path = get_journal_path(file_path)
+    with open(f"{journal_path}.tmp", "w") as journal_file:
+        json.dump(journal, journal_file)
+    os.replace(f"{journal_path}.tmp", journal_path)
+
+
+def remove_journal(file_path):
+    try:
+        os.remove(get_journal_path(file_path))
+    except FileNotFoundError:
+        pass
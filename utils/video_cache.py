@@ -0,0 +1,97 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "youtube2audio", "videos.sqlite3")
+# Seconds before cached video metadata is fetched again.
+CACHE_TTL = 7 * 24 * 60 * 60
+# Stream format fields kept from youtube_dl formats.
+FORMAT_FIELDS = ("format_id", "ext", "acodec", "vcodec", "abr", "filesize")
+
+_video_cache = None
+_video_cache_lock = threading.Lock()
+
+
+class VideoInfoCache:
+    """SQLite cache of the video metadata fields we use (title, id, duration
+    and stream formats) keyed by video id. Entries expire after `ttl` seconds.
+    Safe to share between threads."""
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS videos (id TEXT PRIMARY KEY, info TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    def get(self, video_id):
+        """Get cached video metadata - None if absent or expired."""
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT info, fetched_at FROM videos WHERE id = ?", (video_id,)
+                ).fetchone()
+        except sqlite3.Error as error:
+            print(f"Error: {str(error)}")  # poor man's logging
+            return None
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def put(self, video_info):
+        """Cache the used fields of a youtube_dl info dict. Return them."""
+        video_info = slim_video_info(video_info)
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO videos VALUES (?, ?, ?)",
+                    (video_info["id"], json.dumps(video_info), time.time()),
+                )
+        except sqlite3.Error as error:
+            print(f"Error: {str(error)}")  # poor man's logging
+        return video_info
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+def get_video_cache():
+    """Get the process-wide video metadata cache, opened on first use -
+    None if the cache database cannot be opened."""
+    global _video_cache
+    with _video_cache_lock:
+        if _video_cache is None:
+            try:
+                _video_cache = VideoInfoCache()
+            except (OSError, sqlite3.Error) as error:
+                print(f"Error: {str(error)}")  # poor man's logging
+                return None
+        return _video_cache
+
+
+def slim_video_info(video_info):
+    """Get the fields of a youtube_dl info dict that downstream code uses."""
+    return {
+        "title": video_info["title"],
+        "id": video_info["id"],
+        "duration": video_info.get("duration"),
+        "formats": [
+            {key: video_format.get(key) for key in FORMAT_FIELDS} for video_format in video_info.get("formats") or ()
+        ],
+    }
+
+
+def get_video_id(video_url):
+    """Get video id of a YouTube watch or short url - None if not found."""
+    parsed_url = urlparse(video_url)
+    if parsed_url.netloc.endswith("youtu.be"):
+        return parsed_url.path.strip("/") or None
+    return parse_qs(parsed_url.query).get("v", [None])[0]